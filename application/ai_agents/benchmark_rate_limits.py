@@ -0,0 +1,138 @@
+"""
+Drive the LLM rate limiter's AIMD controller and the retry / hedging policy
+against a local mock of the chat completions endpoint that throttles on a
+script: it allows `capacity` requests in flight, answers 429 + Retry-After
+beyond that, and reports x-ratelimit-remaining-* / x-ratelimit-reset-* on
+every response. `stall_pct` percent of requests stall for `stall_ms` (tail
+latency for LLM_HEDGE=true / LLM_ATTEMPT_TIMEOUT to cut off).
+
+    cd application
+    python -m ai_agents.benchmark_rate_limits [calls] [capacity] [latency_ms] [stall_pct] [stall_ms]
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockProvider(BaseHTTPRequestHandler):
+    capacity = 8
+    latency = 0.05
+    stall_ratio = 0.0
+    stall = 2.0
+    window_requests = 60   # requests allowed per reset window
+    window_seconds = 1.0
+
+    _lock = threading.Lock()
+    _inflight = 0
+    _window_start = 0.0
+    _window_used = 0
+    served = 0
+    throttled = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out or its hedge already won
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        with cls._lock:
+            now = time.monotonic()
+            if now - cls._window_start >= cls.window_seconds:
+                cls._window_start, cls._window_used = now, 0
+            reset_in = cls.window_seconds - (now - cls._window_start)
+            over = cls._inflight >= cls.capacity or cls._window_used >= cls.window_requests
+            if not over:
+                cls._inflight += 1
+                cls._window_used += 1
+            remaining = max(0, cls.window_requests - cls._window_used)
+
+        headers = {
+            "x-ratelimit-limit-requests": str(cls.window_requests),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{int(reset_in * 1000)}ms",
+        }
+        if over:
+            with cls._lock:
+                cls.throttled += 1
+            self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {**headers, "retry-after-ms": str(int(reset_in * 1000) if remaining == 0 else 100)})
+            return
+
+        time.sleep(cls.stall if random.random() < cls.stall_ratio else cls.latency)
+        with cls._lock:
+            cls._inflight -= 1
+            cls.served += 1
+        self._reply(200, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": "mock",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "{\"ok\": true}"}}],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+        }, headers)
+
+
+def main(calls=300, capacity=8, latency_ms=50, stall_pct=0, stall_ms=2000):
+    MockProvider.capacity = capacity
+    MockProvider.latency = latency_ms / 1000
+    MockProvider.stall_ratio = stall_pct / 100
+    MockProvider.stall = stall_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # must be set before the shared client is built
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("API_KEY", "mock")
+    from ai_agents.openai_functions import ask_with_instruction_json
+    from ai_agents.rate_limiter import limiter
+    from ai_agents.llm_resilience import resilience
+
+    print(f"🧪 mock provider: {capacity} in flight, {MockProvider.window_requests} req/{MockProvider.window_seconds:g}s, "
+          f"{latency_ms} ms latency, {stall_pct}% stall {stall_ms} ms; {calls} calls")
+
+    done = threading.Event()
+
+    def report():
+        while not done.wait(0.5):
+            c = limiter.stats()["concurrency"]
+            print(f"  limit={c['limit']:>6} inflight={c['inflight']:>3} paused={c['paused_for_s']}s "
+                  f"served={MockProvider.served} 429s={MockProvider.throttled}")
+
+    threading.Thread(target=report, daemon=True).start()
+    start = time.perf_counter()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        for future in [pool.submit(ask_with_instruction_json, "mock", f"call {i}") for i in range(calls)]:
+            try:
+                future.result()
+            except Exception as e:
+                failures += 1
+                print("❌", type(e).__name__, str(e)[:80])
+    elapsed = time.perf_counter() - start
+    done.set()
+    server.shutdown()
+
+    print(f"✅ {calls - failures}/{calls} calls in {elapsed:.2f}s ({(calls - failures) / elapsed:.1f}/s), "
+          f"{MockProvider.throttled} throttled responses")
+    print(json.dumps(limiter.stats()["concurrency"], indent=2))
+    print(json.dumps(resilience.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:6]))
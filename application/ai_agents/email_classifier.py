@@ -0,0 +1,272 @@
+"""
+Local fast path for classify_email_status: a softmax-regression model over
+hashed word uni/bigrams, trained from labeled email history.
+
+    cd application
+    python -m ai_agents.email_classifier train [history.jsonl]
+
+History lines are {"email_content": ..., "status": ...}. With
+EMAIL_CLASSIFIER_HISTORY set, the LLM's own classifications are appended to
+it as they happen, up to EMAIL_CLASSIFIER_HISTORY_MAX_MB.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+import numpy as np
+from ai_agents.model_router import EMAIL_STATUSES
+from utils import config as Config
+
+
+# Statuses the local model may answer on its own; `required` needs the exact
+# request quoted from the email, so it always goes to the LLM.
+LOCAL_STATUSES = ("checked", "accepted", "rejected")
+
+# Same wording as the examples in the email_status prompt
+NOTIFICATIONS = {
+    "checked": "Your application has been reviewed by the company.",
+    "accepted": "Congratulations! Your application has been accepted.",
+    "rejected": "We’re sorry, your application was not successful.",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def features(text, dim=Config.EMAIL_CLASSIFIER_DIM):
+    """
+    Hashed word unigrams + bigrams (crc32 buckets), log1p counts, L2-normalized.
+    Stopwords stay in: "will not" vs "will" is the whole point.
+    Returns (bucket indices, values).
+    """
+    words = _WORD_RE.findall(str(text).lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    buckets = np.fromiter((zlib.crc32(g.encode("utf-8")) % dim for g in grams), dtype=np.int64, count=len(grams))
+    idx, counts = np.unique(buckets, return_counts=True)
+    values = np.log1p(counts).astype(np.float32)
+    return idx, values / np.linalg.norm(values)
+
+
+class EmailClassifier:
+
+    def __init__(self, weights, bias, labels=EMAIL_STATUSES):
+        self.weights = weights  # (dim, classes) float32
+        self.bias = bias        # (classes,)
+        self.labels = tuple(labels)
+        self.dim = weights.shape[0]
+
+    def predict_proba(self, text):
+        idx, values = features(text, self.dim)
+        scores = values @ self.weights[idx] + self.bias
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, text):
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], [str(label) for label in data["labels"]])
+
+    @classmethod
+    def train(cls, texts, labels, dim=Config.EMAIL_CLASSIFIER_DIM, epochs=200, lr=0.5, l2=1e-4):
+        """
+        Full-batch softmax regression with Adagrad over the sparse hashed features.
+        """
+        classes = list(EMAIL_STATUSES)
+        y = np.array([classes.index(label) for label in labels])
+        rows, cols, vals = [], [], []
+        for row, text in enumerate(texts):
+            idx, values = features(text, dim)
+            rows.append(np.full(len(idx), row))
+            cols.append(idx)
+            vals.append(values)
+        rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)[:, None]
+
+        n, k = len(texts), len(classes)
+        onehot = np.eye(k, dtype=np.float32)[y]
+        weights = np.zeros((dim, k), dtype=np.float32)
+        bias = np.log(onehot.mean(axis=0) + 1e-6).astype(np.float32)
+        used = np.unique(cols)
+        w_acc = np.full((dim, k), 1e-8, dtype=np.float32)
+        b_acc = np.full(k, 1e-8, dtype=np.float32)
+
+        for _ in range(epochs):
+            scores = np.tile(bias, (n, 1))
+            np.add.at(scores, rows, weights[cols] * vals)
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            error = scores / scores.sum(axis=1, keepdims=True) - onehot
+
+            grad = np.zeros((dim, k), dtype=np.float32)
+            np.add.at(grad, cols, error[rows] * vals)
+            grad[used] = grad[used] / n + l2 * weights[used]
+            grad_b = error.mean(axis=0)
+
+            w_acc[used] += grad[used] ** 2
+            weights[used] -= lr * grad[used] / np.sqrt(w_acc[used])
+            b_acc += grad_b ** 2
+            bias -= lr * grad_b / np.sqrt(b_acc)
+
+        return cls(weights, bias, classes)
+
+
+# -----------------------------
+# Fast path used by job_status.classify_email_status
+# -----------------------------
+_lock = threading.Lock()
+_history_lock = threading.Lock()
+_classifier = None
+_loaded = False
+_stats = {"local": {status: 0 for status in LOCAL_STATUSES}, "fallthrough": {"no_model": 0, "low_confidence": 0, "required": 0}, "local_us_total": 0.0}
+
+
+def get_email_classifier():
+    """
+    The trained model at EMAIL_CLASSIFIER_PATH, or None if there is none (fast path off).
+    """
+    global _classifier, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                if Config.EMAIL_CLASSIFIER_ENABLED and os.path.exists(Config.EMAIL_CLASSIFIER_PATH):
+                    _classifier = EmailClassifier.load(Config.EMAIL_CLASSIFIER_PATH)
+                    print(f"📨 Email classifier loaded from {Config.EMAIL_CLASSIFIER_PATH}")
+                _loaded = True
+    return _classifier
+
+
+def fast_classify(email_content):
+    """
+    {status, notification} when the local model is confident about a
+    checked/accepted/rejected email, else None (ask the LLM).
+    """
+    classifier = get_email_classifier()
+    if classifier is None:
+        reason, answer = "no_model", None
+    else:
+        start = time.perf_counter()
+        status, confidence = classifier.predict(email_content)
+        elapsed_us = 1e6 * (time.perf_counter() - start)
+        if status not in LOCAL_STATUSES:
+            reason, answer = "required", None
+        elif confidence < Config.EMAIL_CLASSIFIER_THRESHOLD:
+            reason, answer = "low_confidence", None
+        else:
+            reason, answer = None, {"status": status, "notification": NOTIFICATIONS[status]}
+
+    with _lock:
+        if answer is not None:
+            _stats["local"][answer["status"]] += 1
+            _stats["local_us_total"] += elapsed_us
+        else:
+            _stats["fallthrough"][reason] += 1
+    return answer
+
+
+def record_labels(labeled):
+    """
+    Append (email_content, status) pairs labeled by the LLM to the training
+    history in one write (EMAIL_CLASSIFIER_HISTORY, "" = off). Blocking file
+    I/O: async callers run it in the thread pool.
+    """
+    path = Config.EMAIL_CLASSIFIER_HISTORY
+    lines = [
+        json.dumps({"email_content": email_content, "status": status}, ensure_ascii=False) + "\n"
+        for email_content, status in labeled if status in EMAIL_STATUSES
+    ]
+    if not path or not lines:
+        return
+    with _history_lock:
+        if os.path.exists(path) and os.path.getsize(path) >= Config.EMAIL_CLASSIFIER_HISTORY_MAX_MB * 1024 * 1024:
+            return  # full: train on it and move it aside to record more
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+
+def record_label(email_content, status):
+    record_labels([(email_content, status)])
+
+
+def classifier_stats():
+    with _lock:
+        local = sum(_stats["local"].values())
+        total = local + sum(_stats["fallthrough"].values())
+        return {
+            "model_loaded": _classifier is not None,
+            "threshold": Config.EMAIL_CLASSIFIER_THRESHOLD,
+            "local": dict(_stats["local"]),
+            "fallthrough": dict(_stats["fallthrough"]),
+            "local_share": round(local / total, 3) if total else 0.0,
+            "local_us_avg": round(_stats["local_us_total"] / local, 1) if local else None,
+        }
+
+
+# -----------------------------
+# Training CLI
+# -----------------------------
+def _read_history(path):
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("status") in EMAIL_STATUSES and row.get("email_content"):
+                texts.append(row["email_content"])
+                labels.append(row["status"])
+    return texts, labels
+
+
+def _evaluate(classifier, texts, labels, threshold):
+    answered = correct = 0
+    for text, label in zip(texts, labels):
+        status, confidence = classifier.predict(text)
+        if status in LOCAL_STATUSES and confidence >= threshold:
+            answered += 1
+            correct += status == label
+    return answered, correct
+
+
+def main(history_path=Config.EMAIL_CLASSIFIER_HISTORY):
+    if not history_path:
+        print("No history: pass a history.jsonl or set EMAIL_CLASSIFIER_HISTORY.")
+        return
+    texts, labels = _read_history(history_path)
+    # identical bodies are one example, labeled by their latest classification
+    latest = dict(zip(texts, labels))
+    texts, labels = list(latest), list(latest.values())
+    print(f"📨 {len(texts)} labeled emails from {history_path}: " + ", ".join(f"{s}={labels.count(s)}" for s in EMAIL_STATUSES))
+    if len(texts) < 20:
+        print("Not enough history to train; set EMAIL_CLASSIFIER_HISTORY and come back later.")
+        return
+
+    order = np.random.default_rng(0).permutation(len(texts))
+    split = int(0.8 * len(texts))
+    train_ids, test_ids = order[:split], order[split:]
+    held_out = EmailClassifier.train([texts[i] for i in train_ids], [labels[i] for i in train_ids])
+    answered, correct = _evaluate(held_out, [texts[i] for i in test_ids], [labels[i] for i in test_ids], Config.EMAIL_CLASSIFIER_THRESHOLD)
+    print(f"held-out @ threshold {Config.EMAIL_CLASSIFIER_THRESHOLD}: answered locally {answered}/{len(test_ids)}, "
+          f"precision {correct / answered if answered else 0:.3f}")
+
+    classifier = EmailClassifier.train(texts, labels)
+    classifier.save(Config.EMAIL_CLASSIFIER_PATH)
+    print(f"✅ saved to {Config.EMAIL_CLASSIFIER_PATH}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "train":
+        print(__doc__)
+        sys.exit(1)
+    main(*sys.argv[2:3])
@@ -0,0 +1,160 @@
+import json
+from ai_agents.openai_functions import ask_with_instruction_json, ask_with_instruction_json_async
+from ai_agents.payload_compaction import compact_resume, compact_jobs, compact_job, minify, record_savings
+from ai_agents.prompt_registry import get_prompt, match_weights
+from ai_agents.model_router import router, validate_match
+from utils.token_count import count_tokens
+from utils import config as Config
+
+
+# Matching modes:
+#   detailed - full get_matching_score_json structure (requirement/candidate/notes per dimension)
+#   compact  - ids + per-dimension numbers only; match_score is summed locally
+MATCH_MODES = ("detailed", "compact")
+MATCH_DIMENSIONS = ("skills", "work_experience", "projects", "qualification")
+
+
+def get_match_prompt(mode="detailed"):
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode '{mode}', expected one of {MATCH_MODES}.")
+    return get_prompt(f"job_match_{mode}")
+
+
+def build_match_instructions(resume_json, jobs_json, mode="detailed", track_savings=True):
+    prompt = get_match_prompt(mode)
+
+    # Only the matched sections / useful job fields, as minified JSON
+    original_payload = f"{resume_json}\n{jobs_json}"
+    resume_json = minify(compact_resume(resume_json, "match"))
+    jobs_json = minify(compact_jobs(jobs_json))
+    if track_savings:
+        record_savings("match", original_payload, f"{resume_json}\n{jobs_json}")
+
+    return prompt.render(resume_json=resume_json, jobs_json=jobs_json)
+
+
+MATCH_TASK = "match jobs with resume data and return jobs"
+
+
+class BatchPacker:
+    """
+    Packs jobs into matcher batches by estimated tokens instead of a fixed count.
+
+    A batch closes once its prompt (instructions + compacted resume and jobs) plus the
+    expected output (`MATCH_OUTPUT_TOKENS_PER_JOB[mode]` per job) would exceed
+    `budget`, its output alone would exceed `max_output_tokens`, or it holds
+    `max_jobs`. Jobs keep their arrival order. A job that is over budget on its
+    own still goes out, alone.
+
+    add()/flush() return finished batches as (jobs, tags, fill_ratio), where
+    tags are whatever was passed alongside each job (e.g. its page) and
+    fill_ratio is the batch's tokens over `budget`.
+    """
+
+    def __init__(self, resume_json, mode="detailed", budget=Config.MATCH_TOKEN_BUDGET,
+                 max_output_tokens=Config.MATCH_MAX_OUTPUT_TOKENS, max_jobs=Config.MATCH_MAX_BATCH_JOBS):
+        self.budget = budget
+        self.max_output_tokens = max_output_tokens
+        self.max_jobs = max_jobs
+        self.output_per_job = Config.MATCH_OUTPUT_TOKENS_PER_JOB[mode]
+        self.base_tokens = count_tokens(build_match_instructions(resume_json, [], mode, track_savings=False)) + count_tokens(MATCH_TASK)
+
+        self._jobs, self._tags = [], []
+        self._tokens = self.base_tokens
+        self.batches = 0
+        self.fill_ratios = []
+
+    def _job_tokens(self, job):
+        # jobs are interpolated as one minified JSON list; "," joins the items
+        return count_tokens(minify(compact_job(job))) + 1 + self.output_per_job
+
+    def add(self, job, tag=None):
+        finished = []
+        job_tokens = self._job_tokens(job)
+        if self._jobs and (
+            (self.budget and self._tokens + job_tokens > self.budget)
+            or (len(self._jobs) + 1) * self.output_per_job > self.max_output_tokens
+            or len(self._jobs) >= self.max_jobs
+        ):
+            finished.append(self._close())
+
+        self._jobs.append(job)
+        self._tags.append(tag)
+        self._tokens += job_tokens
+        return finished
+
+    def flush(self):
+        return [self._close()] if self._jobs else []
+
+    def pending_tags(self):
+        return set(self._tags)
+
+    def _close(self):
+        fill_ratio = self._tokens / self.budget if self.budget else None
+        batch = (self._jobs, self._tags, fill_ratio)
+        self.batches += 1
+        if fill_ratio is not None:
+            self.fill_ratios.append(fill_ratio)
+        self._jobs, self._tags = [], []
+        self._tokens = self.base_tokens
+        return batch
+
+    def summary(self):
+        ratios = self.fill_ratios
+        return {
+            "batches": self.batches,
+            "avg_fill_ratio": round(sum(ratios) / len(ratios), 3) if ratios else None,
+            "min_fill_ratio": round(min(ratios), 3) if ratios else None,
+        }
+
+
+def _clamp_score(value, max_score):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return max(0, min(value, max_score))
+
+
+def normalize_matched_jobs(response, mode="detailed"):
+    """
+    Parsed model output -> list of matched jobs that always carry `match_score`.
+    In compact mode the total is the sum of the per-dimension scores, each
+    clamped to its weightage.
+    """
+    matched_jobs = response.get("matched_jobs", [])
+    if mode != "compact":
+        return matched_jobs
+
+    weights = match_weights()
+    for job in matched_jobs:
+        job["match_score"] = round(sum(
+            _clamp_score(job.get(dimension), weights[f"{dimension}_weightage"])
+            for dimension in MATCH_DIMENSIONS
+        ))
+    return matched_jobs
+
+
+def match_job_ids(jobs_json):
+    # what the matcher has to echo back as job_id
+    return [str(job["_id"]) for job in jobs_json if job.get("_id")]
+
+
+def score_jobs(resume_json, jobs_json, mode="detailed"):
+    instructions = build_match_instructions(resume_json, jobs_json, mode)
+    response = router.run(
+        "job_match",
+        lambda model: ask_with_instruction_json(instructions, MATCH_TASK, model=model),
+        validate=validate_match(match_job_ids(jobs_json)),
+    )
+    return normalize_matched_jobs(json.loads(response), mode)
+
+
+async def score_jobs_async(resume_json, jobs_json, mode="detailed"):
+    instructions = build_match_instructions(resume_json, jobs_json, mode)
+    response = await router.run_async(
+        "job_match",
+        lambda model: ask_with_instruction_json_async(instructions, MATCH_TASK, model=model),
+        validate=validate_match(match_job_ids(jobs_json)),
+    )
+    return normalize_matched_jobs(json.loads(response), mode)
@@ -1,11 +1,16 @@
-from openai import OpenAI
+import asyncio
 import json
+import time
 from utils import config as Config
 from fastapi import FastAPI, Form
 
-client = OpenAI(api_key=Config.API_KEY)
-
-from ai_agents.openai_functions import ask_with_instruction_json
+from ai_agents.openai_functions import ask_with_instruction_json, ask_with_instruction_json_async
+from ai_agents.prompt_registry import get_prompt
+from ai_agents.model_router import router, check_email_status, ValidationFailed
+from ai_agents.email_classifier import fast_classify, record_label, record_labels
+from ai_agents.payload_compaction import minify
+from utils.thread_pool import run_in_pool
+from utils.token_count import count_tokens
 
 
 system_prompt = """
@@ -44,80 +49,172 @@ Respond ONLY with a JSON object that matches this schema:
 """
 
 
-def classify_email_status(email_content: str, model: str = Config.MODEL):
-
-    message = "Classify job application emails as checked, required, accepted, or rejected; return JSON {status, notification}; notification must be one short polite line in second-person; if required, extract the exact request(s) from the email."
-
-    system_prompt = f"""
-    You are an assistant for an automated job application management system. 
-    Your task is to classify incoming job application-related emails into one of four statuses 
-    and generate a short, clear notification message for the candidate.
-
-    ### STATUS DEFINITIONS:
-    - checked: The company has acknowledged, confirmed receipt, or reviewed the application 
-            (but no further action or decision is mentioned).
-    - required: The company explicitly requests additional documents, actions, or information 
-                (e.g., resume, portfolio, certificates, references, ID proof, assessments, forms).
-                This status is ONLY used when the email contains a clear request for something specific. 
-                Be very careful to extract exactly what is requested from the email — no assumptions.
-    - accepted: The application has been approved, shortlisted, the candidate is invited for 
-                interview/next round, or hired.
-    - rejected: The application is declined or the candidate is not moving forward.
-
-    ### NOTIFICATION RULES:
-    - Keep the notification very short, direct, and polite.
-    - Always use second-person voice ("Your application...").
-    - Examples:
-    - checked → "Your application has been reviewed by the company."
-    - required → "The company needs additional information: [insert requirement(s) exactly as stated in the email]."
-    - accepted → "Congratulations! Your application has been accepted."
-    - rejected → "We’re sorry, your application was not successful."
-    - For **required status**, never summarize vaguely — copy the specific requirement(s) mentioned 
-    (e.g., "updated resume", "two references", "portfolio link", "government ID copy").  
-    If multiple requirements are listed, include all of them in the notification.
-
-    Given Input Email Content: 
-    {email_content}
-
-    ### OUTPUT FORMAT:
-    Respond ONLY with a JSON object that matches this schema:
-    {{
-    "status": "checked" | "required" | "accepted" | "rejected",
-    "notification": "string"
-    }}
+def classify_email_status(email_content: str, model: str = None):
+    """
+    Boilerplate checked/accepted/rejected emails are answered by the local
+    classifier (ai_agents.email_classifier); the rest go through the model
+    tiers (ai_agents.model_router), or to `model` when one is given.
     """
+    if model is None:
+        local = fast_classify(email_content)
+        if local is not None:
+            return json.dumps(local)
+
+    message = "Classify job application emails as checked, required, accepted, or rejected; return JSON {status, notification, confidence}; notification must be one short polite line in second-person; if required, extract the exact request(s) from the email."
+
+    system_prompt = get_prompt("email_status").render(email_content=email_content)
+
+    if model is not None:
+        result = ask_with_instruction_json(system_prompt, message, model=model)
+    else:
+        result = router.run("email_status", lambda model: ask_with_instruction_json(system_prompt, message, model=model))
+
+    try:
+        parsed = json.loads(result)
+    except json.JSONDecodeError:
+        return result
+
+    parsed.pop("confidence", None)  # only drives model routing; callers get {status, notification}
+    record_label(email_content, parsed.get("status"))  # training history for the local classifier
+    return json.dumps(parsed)
+
 
 
-    result = ask_with_instruction_json(system_prompt, message)
 
-    return result
 
+# -----------------------------
+# Bulk classification (/classify-job-status/batch)
+# -----------------------------
+# Identical bodies are classified once. The local classifier answers what it
+# can; the rest are packed several per LLM call (short ids in, one result per
+# id out) and the calls run concurrently. Each round runs on one model tier;
+# emails a batch reply leaves out or answers with low confidence are re-packed
+# for the next tier, like a single request would escalate. Whatever is left
+# after the top tier gets one single-email call on the top tier.
 
+BATCH_MESSAGE = "Classify each job application email as checked, required, accepted, or rejected; return JSON {results: [{id, status, notification, confidence}]} with one entry per input id."
 
 
+def pack_email_batches(texts, max_emails=Config.EMAIL_BATCH_SIZE, budget=Config.EMAIL_BATCH_TOKEN_BUDGET):
+    batches, batch, tokens = [], [], 0
+    for text in texts:
+        text_tokens = count_tokens(text)
+        if batch and (len(batch) >= max_emails or tokens + text_tokens > budget):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += text_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def classify_email_batch_async(texts, escalate=0):
+    """
+    One LLM call for several emails, on the tier `escalate` steps above the
+    task's start and no other -> {text: {status, notification}} for the
+    answers that pass check_email_status; the rest are left out.
+    """
+    emails_json = minify([{"id": str(i), "email": text} for i, text in enumerate(texts)])
+    prompt = get_prompt("email_status_batch").render(emails_json=emails_json)
+    output = await router.run_async(
+        "email_status_batch",
+        lambda model: ask_with_instruction_json_async(prompt, BATCH_MESSAGE, model=model),
+        size_text=emails_json,
+        escalate=escalate,
+        max_tiers=1,  # the caller re-packs what this tier missed for the next one
+    )
+
+    try:
+        items = json.loads(output).get("results") or []
+    except (json.JSONDecodeError, AttributeError):
+        return {}
+
+    answers = {}
+    for item in items:
+        try:
+            index = int(item.get("id"))
+            check_email_status(item)
+        except (ValidationFailed, TypeError, ValueError, AttributeError):
+            continue
+        if not 0 <= index < len(texts):
+            continue
+        text = texts[index]
+        answers[text] = {"status": item["status"], "notification": item["notification"]}
+    if Config.EMAIL_CLASSIFIER_HISTORY and answers:
+        await run_in_pool(record_labels, [(text, answer["status"]) for text, answer in answers.items()])
+    return answers
+
+
+def _classify_locally(texts):
+    return {text: fast_classify(text) for text in texts}
+
+
+async def classify_email_statuses_async(emails, concurrency=Config.EMAIL_BATCH_CONCURRENCY):
+    """
+    List of email bodies -> ({status, notification} per email, in order; {"error"} where
+    even the single-email path failed), and counters for the run.
+    """
+    started = time.perf_counter()
+    unique = list(dict.fromkeys(email.strip() for email in emails))
+
+    local = await run_in_pool(_classify_locally, unique)
+    answers = {text: answer for text, answer in local.items() if answer is not None}
+    pending = [text for text in unique if text not in answers]
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run_batch(batch, escalate):
+        async with limit:
+            try:
+                return await classify_email_batch_async(batch, escalate)
+            except Exception as e:
+                print(f"❌ Email batch of {len(batch)} failed:", str(e))
+                return {}
+
+    leftovers, llm_batches = pending, 0
+    for escalate in range(len(router.models_for("email_status_batch"))):
+        batches = pack_email_batches(leftovers)
+        llm_batches += len(batches)
+        for batch_answers in await asyncio.gather(*(run_batch(batch, escalate) for batch in batches)):
+            answers.update(batch_answers)
+        leftovers = [text for text in leftovers if text not in answers]
+        if not leftovers:
+            break
+    batched = len(pending) - len(leftovers)
+    errors = 0
+    top_model = router.models_for("email_status")[-1]
+
+    async def run_single(text):
+        nonlocal errors
+        async with limit:
+            try:
+                answers[text] = json.loads(await run_in_pool(classify_email_status, text, top_model))
+            except Exception as e:
+                errors += 1
+                answers[text] = {"error": str(e)}
+
+    await asyncio.gather(*(run_single(text) for text in leftovers))
+
+    stats = {
+        "emails": len(emails),
+        "unique": len(unique),
+        "local": len(unique) - len(pending),
+        "llm_batches": llm_batches,
+        "batched": batched,
+        "single": len(leftovers),
+        "errors": errors,
+        "elapsed_ms": round(1000 * (time.perf_counter() - started), 1),
+    }
+    return [answers[email.strip()] for email in emails], stats
+
 
 def check_validity_email(
     company_email_content: str = Form(...),
     user_response_content: str = Form(...)
 ):
-    prompt = f"""
-    You are an AI email validator.
-
-    Company Email (request):
-    \"\"\"{company_email_content}\"\"\"
-
-    User Response:
-    \"\"\"{user_response_content}\"\"\"
-
-    Tasks:
-    1. Identify what the company is asking for (requirements).
-    2. Check if the user's response fulfills ALL requirements.
-    3. Check if the user's response contains any spam, irrelevant, or promotional content.
-    4. Return a JSON with:
-    - status: "valid" if all requirements are fulfilled and no spam, otherwise "not valid"
-    - description: short explanation of why it's valid or not.
-    """
+    prompt = get_prompt("email_validity").render(company_email_content=company_email_content, user_response_content=user_response_content)
 
-    result = ask_with_instruction_json(prompt, "Validate the user's email response")
+    result = router.run("email_validity", lambda model: ask_with_instruction_json(prompt, "Validate the user's email response", model=model))
 
     return result
\ No newline at end of file
@@ -0,0 +1,112 @@
+import threading
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from ai_agents.rate_limiter import limiter
+from utils import config as Config
+
+
+# -----------------------------
+# Process-wide OpenAI clients
+# -----------------------------
+_lock = threading.Lock()
+_sync_client = None
+_async_client = None
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=Config.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout():
+    return httpx.Timeout(Config.OPENAI_TIMEOUT, connect=Config.OPENAI_CONNECT_TIMEOUT)
+
+
+# Every provider response (including the SDK's own retries) feeds the limiter's
+# AIMD controller: 429s, Retry-After and x-ratelimit-* headers.
+def _observe_response(response):
+    limiter.observe_response(response.status_code, response.headers)
+
+
+async def _observe_response_async(response):
+    limiter.observe_response(response.status_code, response.headers)
+
+
+def get_client() -> OpenAI:
+    """
+    Return the shared sync OpenAI client. Built once per process so every call
+    reuses the same keep-alive connection pool instead of a new TLS handshake.
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = OpenAI(
+                    api_key=Config.API_KEY,
+                    base_url=Config.OPENAI_BASE_URL,
+                    timeout=_timeout(),
+                    max_retries=Config.OPENAI_MAX_RETRIES,
+                    http_client=DefaultHttpxClient(
+                        limits=_limits(), timeout=_timeout(),
+                        event_hooks={"response": [_observe_response]},
+                    ),
+                )
+    return _sync_client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Return the shared async OpenAI client (same pool limits and timeouts as the sync one).
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(
+                    api_key=Config.API_KEY,
+                    base_url=Config.OPENAI_BASE_URL,
+                    timeout=_timeout(),
+                    max_retries=Config.OPENAI_MAX_RETRIES,
+                    http_client=DefaultAsyncHttpxClient(
+                        limits=_limits(), timeout=_timeout(),
+                        event_hooks={"response": [_observe_response_async]},
+                    ),
+                )
+    return _async_client
+
+
+def warm_up():
+    """
+    Open a connection on the sync client so the first real request skips DNS + TLS.
+    """
+    try:
+        get_client().models.list()
+        print("🟢 OpenAI sync client warmed")
+    except Exception as e:
+        print("❌ OpenAI sync warm-up failed:", str(e))
+
+
+async def warm_up_async():
+    try:
+        await get_async_client().models.list()
+        print("🟢 OpenAI async client warmed")
+    except Exception as e:
+        print("❌ OpenAI async warm-up failed:", str(e))
+
+
+async def close_clients():
+    """
+    Release pooled connections on shutdown.
+    """
+    global _sync_client, _async_client
+    with _lock:
+        sync_client, async_client = _sync_client, _async_client
+        _sync_client = _async_client = None
+
+    if sync_client is not None:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.close()
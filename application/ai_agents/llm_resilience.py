@@ -0,0 +1,345 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+import openai
+from ai_agents.rate_limiter import limiter, parse_retry_after, LLMQueueTimeout
+from utils import config as Config
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised when an LLM call (all attempts and hedges) runs past its deadline."""
+
+
+# -----------------------------
+# Retry / deadline / hedging policy
+# -----------------------------
+# Every non-streaming call in openai_functions goes through here. A call has
+# one deadline (LLM_DEADLINE seconds) covering all of its attempts; each
+# attempt also gets LLM_ATTEMPT_TIMEOUT as its HTTP timeout, so one stalled
+# completion is cut off and retried instead of pinning the request. Transient
+# errors are retried with full-jitter exponential backoff (never shorter than
+# the provider's Retry-After). With hedging on, an attempt that is still
+# running after the operation's recent p95 latency gets a duplicate request,
+# and whichever answers first wins. Each attempt, hedges included, takes its
+# own slot from the rate limiter.
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return 0.0
+    return parse_retry_after(response.headers) or 0.0
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return samples[int(q * (len(samples) - 1))] if samples else None
+
+
+class OperationStats:
+
+    def __init__(self, samples):
+        self.latencies = deque(maxlen=samples)  # successful requests after the limiter grant, seconds (hedge delay source)
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.attempt_timeouts = 0
+        self.deadline_exceeded = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.call_ms = deque(maxlen=samples)  # whole calls, retries and hedges included
+
+    def snapshot(self):
+        call_ms = list(self.call_ms)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "attempt_timeouts": self.attempt_timeouts,
+            "deadline_exceeded": self.deadline_exceeded,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedges, 3) if self.hedges else None,
+            "latency_ms_p50": round(_percentile(call_ms, 0.50), 1) if call_ms else None,
+            "latency_ms_p95": round(_percentile(call_ms, 0.95), 1) if call_ms else None,
+            "latency_ms_p99": round(_percentile(call_ms, 0.99), 1) if call_ms else None,
+        }
+
+
+class LLMResilience:
+    """
+    call(name, texts, create, **kwargs) runs `create(**kwargs, timeout=...)`
+    (an OpenAI SDK method) under the policy above; `name` keys the stats and
+    the latency history hedging uses, `texts` sizes the rate limiter estimate.
+    call_async() is the same for the async client.
+    """
+
+    def __init__(self, deadline, attempt_timeout, max_attempts, backoff_base, backoff_max,
+                 hedge, hedge_min_delay, hedge_min_samples, hedge_max_ratio, samples=500):
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_max_ratio = hedge_max_ratio
+        self.samples = samples
+
+        self._lock = threading.Lock()
+        self._ops = {}
+        self._hedge_pool = None
+
+    # ---- bookkeeping ----
+    def _op(self, name):
+        with self._lock:
+            if name not in self._ops:
+                self._ops[name] = OperationStats(self.samples)
+            return self._ops[name]
+
+    def _count(self, op, field, amount=1):
+        with self._lock:
+            setattr(op, field, getattr(op, field) + amount)
+
+    def _hedge_delay(self, op, deadline_at):
+        """
+        Seconds to wait before hedging this attempt, or None for no hedge.
+        """
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(op.latencies) < self.hedge_min_samples or op.hedges >= self.hedge_max_ratio * max(op.calls, 1):
+                return None
+            delay = max(self.hedge_min_delay, _percentile(op.latencies, 0.95))
+        return delay if time.monotonic() + delay < deadline_at else None
+
+    def _take_hedge(self, op):
+        # re-checked when the hedge is about to fire: many calls pass _hedge_delay at once
+        with self._lock:
+            if op.hedges >= self.hedge_max_ratio * op.calls:
+                return False
+            op.hedges += 1
+            return True
+
+    def _backoff(self, attempt, error, deadline_at):
+        """
+        Full-jitter exponential backoff, at least the provider's Retry-After.
+        Returns None when the sleep would end past the deadline.
+        """
+        delay = max(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)), _retry_after(error))
+        return delay if time.monotonic() + delay < deadline_at else None
+
+    def _remaining(self, deadline_at):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded("LLM call deadline exceeded")
+        return remaining
+
+    def _attempt_timeout(self, deadline_at):
+        return min(self.attempt_timeout, self._remaining(deadline_at))
+
+    def _finish(self, op, start, error=None):
+        with self._lock:
+            op.call_ms.append(1000 * (time.perf_counter() - start))
+            if error is not None:
+                op.failures += 1
+                if isinstance(error, LLMDeadlineExceeded):
+                    op.deadline_exceeded += 1
+
+    # ---- sync ----
+    def _attempt(self, op, texts, create, kwargs, deadline_at, started=None, hedge=False):
+        # a hedge goes to the head of its priority class: behind a long queue it could never win;
+        # the deadline also bounds the wait in the queue (a stall or Retry-After pause)
+        try:
+            with limiter.call(*texts, front=hedge, timeout=self._remaining(deadline_at)) as call:
+                start = time.perf_counter()
+                if started is not None:
+                    started.set()
+                response = create(**kwargs, timeout=self._attempt_timeout(deadline_at))
+                call.usage = getattr(response, "usage", None)
+        except LLMQueueTimeout as e:
+            raise LLMDeadlineExceeded("LLM call deadline exceeded waiting for the rate limiter") from e
+        with self._lock:
+            op.latencies.append(time.perf_counter() - start)
+        return response
+
+    def _get_hedge_pool(self):
+        with self._lock:
+            if self._hedge_pool is None:
+                # the primary and its hedge both run here; the caller waits on whichever finishes first
+                self._hedge_pool = ThreadPoolExecutor(max_workers=Config.LLM_HEDGE_THREADS, thread_name_prefix="llm-hedge")
+            return self._hedge_pool
+
+    def _hedged_attempt(self, op, texts, create, kwargs, deadline_at, delay):
+        pool = self._get_hedge_pool()
+        # the caller's contextvars (LLM priority class) carry over to both requests
+        started = threading.Event()
+        primary = pool.submit(contextvars.copy_context().run, self._attempt, op, texts, create, kwargs, deadline_at, started)
+        primary.add_done_callback(lambda _: started.set())
+        started.wait()  # the hedge delay counts from the request, not from the rate limiter queue
+        done, _ = wait_futures([primary], timeout=delay)
+        if done or not self._take_hedge(op):
+            return primary.result()
+
+        hedge = pool.submit(contextvars.copy_context().run, self._attempt, op, texts, create, kwargs, deadline_at, None, True)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count(op, "hedge_wins")
+                    # the loser can't be interrupted in a thread; it finishes (or times out) on its own
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def call(self, name, texts, create, deadline=None, **kwargs):
+        op = self._op(name)
+        self._count(op, "calls")
+        start = time.perf_counter()
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+
+        for attempt in range(self.max_attempts):
+            try:
+                delay = self._hedge_delay(op, deadline_at)
+                if delay is None:
+                    response = self._attempt(op, texts, create, kwargs, deadline_at)
+                else:
+                    response = self._hedged_attempt(op, texts, create, kwargs, deadline_at, delay)
+                self._finish(op, start)
+                return response
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.APITimeoutError):
+                    self._count(op, "attempt_timeouts")
+                if attempt + 1 >= self.max_attempts:
+                    self._finish(op, start, e)
+                    raise
+                sleep = self._backoff(attempt, e, deadline_at)
+                if sleep is None:
+                    error = LLMDeadlineExceeded(f"{name}: deadline exceeded after {attempt + 1} attempts")
+                    self._finish(op, start, error)
+                    raise error from e
+                print(f"🔁 {name}: {type(e).__name__}, retry {attempt + 1} in {sleep:.2f}s")
+                self._count(op, "retries")
+                time.sleep(sleep)
+            except Exception as e:
+                self._finish(op, start, e)
+                raise
+
+    # ---- async ----
+    async def _attempt_async(self, op, texts, create, kwargs, deadline_at, started=None, hedge=False):
+        try:
+            async with limiter.call_async(*texts, front=hedge, timeout=self._remaining(deadline_at)) as call:
+                start = time.perf_counter()
+                if started is not None:
+                    started.set()
+                response = await create(**kwargs, timeout=self._attempt_timeout(deadline_at))
+                call.usage = getattr(response, "usage", None)
+        except LLMQueueTimeout as e:
+            raise LLMDeadlineExceeded("LLM call deadline exceeded waiting for the rate limiter") from e
+        with self._lock:
+            op.latencies.append(time.perf_counter() - start)
+        return response
+
+    async def _hedged_attempt_async(self, op, texts, create, kwargs, deadline_at, delay):
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self._attempt_async(op, texts, create, kwargs, deadline_at, started))
+        primary.add_done_callback(lambda _: started.set())
+        await started.wait()  # the hedge delay counts from the request, not from the rate limiter queue
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done or not self._take_hedge(op):
+            return await primary
+
+        hedge = asyncio.ensure_future(self._attempt_async(op, texts, create, kwargs, deadline_at, hedge=True))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count(op, "hedge_wins")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:  # the loser: cancelling it releases its limiter slot
+                task.cancel()
+
+    async def call_async(self, name, texts, create, deadline=None, **kwargs):
+        op = self._op(name)
+        self._count(op, "calls")
+        start = time.perf_counter()
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+
+        for attempt in range(self.max_attempts):
+            try:
+                delay = self._hedge_delay(op, deadline_at)
+                if delay is None:
+                    response = await self._attempt_async(op, texts, create, kwargs, deadline_at)
+                else:
+                    response = await self._hedged_attempt_async(op, texts, create, kwargs, deadline_at, delay)
+                self._finish(op, start)
+                return response
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.APITimeoutError):
+                    self._count(op, "attempt_timeouts")
+                if attempt + 1 >= self.max_attempts:
+                    self._finish(op, start, e)
+                    raise
+                sleep = self._backoff(attempt, e, deadline_at)
+                if sleep is None:
+                    error = LLMDeadlineExceeded(f"{name}: deadline exceeded after {attempt + 1} attempts")
+                    self._finish(op, start, error)
+                    raise error from e
+                print(f"🔁 {name}: {type(e).__name__}, retry {attempt + 1} in {sleep:.2f}s")
+                self._count(op, "retries")
+                await asyncio.sleep(sleep)
+            except Exception as e:
+                self._finish(op, start, e)
+                raise
+
+    # ---- metrics ----
+    def stats(self):
+        with self._lock:
+            operations = {name: op.snapshot() for name, op in self._ops.items()}
+        hedges = sum(op["hedges"] for op in operations.values())
+        hedge_wins = sum(op["hedge_wins"] for op in operations.values())
+        return {
+            "deadline_s": self.deadline,
+            "attempt_timeout_s": self.attempt_timeout,
+            "max_attempts": self.max_attempts,
+            "hedging": self.hedge,
+            "hedges": hedges,
+            "hedge_wins": hedge_wins,
+            "hedge_win_rate": round(hedge_wins / hedges, 3) if hedges else None,
+            "operations": operations,
+        }
+
+
+resilience = LLMResilience(
+    deadline=Config.LLM_DEADLINE,
+    attempt_timeout=Config.LLM_ATTEMPT_TIMEOUT,
+    max_attempts=Config.LLM_MAX_ATTEMPTS,
+    backoff_base=Config.LLM_BACKOFF_BASE,
+    backoff_max=Config.LLM_BACKOFF_MAX,
+    hedge=Config.LLM_HEDGE,
+    hedge_min_delay=Config.LLM_HEDGE_MIN_DELAY,
+    hedge_min_samples=Config.LLM_HEDGE_MIN_SAMPLES,
+    hedge_max_ratio=Config.LLM_HEDGE_MAX_RATIO,
+)
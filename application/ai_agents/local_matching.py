@@ -0,0 +1,148 @@
+import math
+import re
+import numpy as np
+from utils import config as Config
+
+
+# -----------------------------
+# Deterministic local match scoring (no LLM)
+# -----------------------------
+# Same four dimensions and weightages as get_matching_score_json. Each
+# dimension is the cosine similarity between the set of resume terms for that
+# dimension and the set of terms in the job post, scaled to its weightage.
+
+DIMENSIONS = ("skills", "work_experience", "projects", "qualification")
+
+# Resume fields feeding each dimension: (section, keys inside each entry or None for the whole value)
+RESUME_FIELDS = {
+    "skills": [("professionalSkills", ("skills",)), ("tags", None), ("workProjects", ("technologiesUsed",))],
+    "work_experience": [("workExperience", ("jobTitle", "employmentType", "description"))],
+    "projects": [("workProjects", ("projectName", "projectDescription", "technologiesUsed"))],
+    "qualification": [("education", ("degreeLevel", "fieldOfStudy", "relevantCoursework"))],
+}
+
+# Job keys that never carry matchable text
+SKIPPED_JOB_KEYS = {"_id", "__v", "createdAt", "updatedAt", "userId", "employerId", "url", "link", "logo", "image"}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it", "of",
+    "on", "or", "our", "that", "the", "their", "this", "to", "we", "will", "with", "you", "your",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize_list(text):
+    tokens = []
+    for token in _TOKEN_RE.findall(str(text).lower()):
+        token = token.rstrip(".")
+        if len(token) > 1 and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def tokenize(text):
+    return set(tokenize_list(text))
+
+
+def _flatten_text(value, skip_keys=()):
+    if isinstance(value, dict):
+        return " ".join(_flatten_text(v, skip_keys) for k, v in value.items() if k not in skip_keys)
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten_text(v, skip_keys) for v in value)
+    if isinstance(value, str):
+        return value
+    return ""
+
+
+def job_text(job):
+    return _flatten_text(job, SKIPPED_JOB_KEYS)
+
+
+def resume_text(resume_json):
+    """
+    Every resume field that feeds a match dimension, plus the about section, as one string.
+    """
+    sections = {section for fields in RESUME_FIELDS.values() for section, _ in fields}
+    return _flatten_text({k: v for k, v in resume_json.items() if k in sections or k == "aboutMe"})
+
+
+def resume_dimension_terms(resume_json):
+    terms = {}
+    for dimension, fields in RESUME_FIELDS.items():
+        texts = []
+        for section, keys in fields:
+            value = resume_json.get(section)
+            if not value:
+                continue
+            entries = value if isinstance(value, list) else [value]
+            for entry in entries:
+                if keys is None or not isinstance(entry, dict):
+                    texts.append(_flatten_text(entry))
+                else:
+                    texts.extend(_flatten_text(entry.get(key, "")) for key in keys)
+        terms[dimension] = tokenize(" ".join(texts))
+    return terms
+
+
+def local_match_scores(resume_json, jobs):
+    """
+    Per-dimension local scores, shape (len(jobs), 4) in DIMENSIONS order,
+    each column already scaled to its Config weightage.
+    """
+    weights = np.array([
+        Config.skills_weightage,
+        Config.work_experience_weightage,
+        Config.projects_weightage,
+        Config.qualification_weightage,
+    ], dtype=np.float32)
+
+    dimension_terms = resume_dimension_terms(resume_json)
+    vocab = sorted(set().union(*dimension_terms.values()))
+    if not jobs or not vocab:
+        return np.zeros((len(jobs), len(DIMENSIONS)), dtype=np.float32)
+
+    index = {term: i for i, term in enumerate(vocab)}
+
+    # D[d, v] = 1 if vocab term v belongs to resume dimension d
+    D = np.zeros((len(DIMENSIONS), len(vocab)), dtype=np.float32)
+    for d, dimension in enumerate(DIMENSIONS):
+        D[d, [index[t] for t in dimension_terms[dimension]]] = 1
+
+    # J[j, v] = 1 if job j mentions vocab term v
+    J = np.zeros((len(jobs), len(vocab)), dtype=np.float32)
+    job_sizes = np.zeros(len(jobs), dtype=np.float32)
+    for j, job in enumerate(jobs):
+        job_terms = tokenize(job_text(job))
+        job_sizes[j] = len(job_terms)
+        hits = [index[t] for t in job_terms if t in index]
+        if hits:
+            J[j, hits] = 1
+
+    overlap = J @ D.T  # (jobs, dimensions)
+    norms = np.sqrt(np.outer(job_sizes, D.sum(axis=1)))
+    cosine = np.divide(overlap, norms, out=np.zeros_like(overlap), where=norms > 0)
+
+    return cosine * weights
+
+
+def prerank_jobs(resume_json, jobs, top_n=Config.PRERANK_TOP_N, min_score=Config.PRERANK_MIN_SCORE):
+    """
+    Split jobs into (shortlist, pruned) using the local score. The shortlist
+    is the top_n jobs scoring at least min_score, best first; pruned is a list
+    of (job, local_score) for everything else.
+    """
+    if not jobs:
+        return [], []
+
+    totals = local_match_scores(resume_json, jobs).sum(axis=1)
+    order = np.argsort(-totals, kind="stable")
+
+    shortlist, pruned = [], []
+    for rank, j in enumerate(order):
+        if rank < top_n and totals[j] >= min_score:
+            shortlist.append(jobs[j])
+        else:
+            pruned.append((jobs[j], int(math.floor(totals[j] + 0.5))))
+
+    return shortlist, pruned
@@ -0,0 +1,262 @@
+import json
+import threading
+from ai_agents import structured_prompt_n_keys
+from utils.token_count import count_tokens
+from utils import config as Config
+
+
+class ValidationFailed(ValueError):
+    """Raised by a task validator when a model's output can't be served as is."""
+
+
+# -----------------------------
+# Tiered model routing
+# -----------------------------
+# Each task starts on the cheapest tier that handles it well (larger inputs
+# can start one tier up). If that tier's output fails the task's validator
+# (schema check, or a confidence / completeness check), the same call is
+# repeated on the next tier up. The output of the top tier is returned as is.
+# With ROUTER_ENABLED=false every task runs once on Config.MODEL.
+
+MODEL_TIERS = {"nano": Config.MODEL_1, "mini": Config.MODEL, "full": Config.MODEL_3}  # cheapest first
+_TIER_NAMES = list(MODEL_TIERS)
+
+# task -> (starting tier, input tokens above which it starts one tier up)
+TASK_ROUTES = {
+    "email_status": ("nano", None),
+    "email_status_batch": ("nano", None),
+    "email_validity": ("nano", None),
+    "resume_parse": ("nano", Config.ROUTER_SHORT_INPUT_TOKENS),
+    "job_match": ("mini", None),
+    "job_email": ("mini", None),
+    "resume_enhance": ("mini", None),
+}
+
+
+# -----------------------------
+# Validators: raise ValidationFailed for output that should escalate
+# -----------------------------
+def _json_object(output):
+    try:
+        parsed = json.loads(output)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValidationFailed(f"invalid JSON: {e}")
+    if not isinstance(parsed, dict):
+        raise ValidationFailed("output is not a JSON object")
+    return parsed
+
+
+def validate_json_object(output):
+    _json_object(output)
+
+
+EMAIL_STATUSES = ("checked", "required", "accepted", "rejected")
+
+
+def check_email_status(parsed):
+    """
+    {status, notification, confidence}: status in EMAIL_STATUSES, a notification,
+    confidence at least ROUTER_MIN_CONFIDENCE.
+    """
+    if parsed.get("status") not in EMAIL_STATUSES:
+        raise ValidationFailed(f"unknown status {parsed.get('status')!r}")
+    if not isinstance(parsed.get("notification"), str) or not parsed["notification"].strip():
+        raise ValidationFailed("missing notification")
+    try:
+        confidence = float(parsed.get("confidence", 0))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    if confidence < Config.ROUTER_MIN_CONFIDENCE:
+        raise ValidationFailed(f"low confidence {confidence}")
+
+
+def validate_email_status(output):
+    check_email_status(_json_object(output))
+
+
+def validate_email_batch(output):
+    # items are checked one by one by the caller; only a broken reply escalates
+    if not isinstance(_json_object(output).get("results"), list):
+        raise ValidationFailed("results is not a list")
+
+
+def validate_email_validity(output):
+    parsed = _json_object(output)
+    if parsed.get("status") not in ("valid", "not valid"):
+        raise ValidationFailed(f"unknown status {parsed.get('status')!r}")
+
+
+_RESUME_KEYS = structured_prompt_n_keys.resume_schema["required"]
+
+
+def validate_resume(output):
+    """
+    All required top-level resume sections present, and a name or email found
+    (cheap models sometimes return the schema skeleton with everything blank).
+    """
+    parsed = _json_object(output)
+    missing = [key for key in _RESUME_KEYS if key not in parsed]
+    if missing:
+        raise ValidationFailed(f"missing sections {missing}")
+    personal = parsed.get("personalInfo") or {}
+    if not (personal.get("firstName") or personal.get("email")):
+        raise ValidationFailed("no name or email extracted")
+
+
+def validate_enhanced_resume(output):
+    parsed = _json_object(output)
+    if not any(key in parsed for key in _RESUME_KEYS):
+        raise ValidationFailed("no resume sections in output")
+
+
+def validate_match(job_ids):
+    """
+    Validator for one matcher batch: every job in `job_ids` comes back scored.
+    """
+    def validate(output):
+        parsed = _json_object(output)
+        matched = parsed.get("matched_jobs")
+        if not isinstance(matched, list):
+            raise ValidationFailed("matched_jobs is not a list")
+        returned = {str(job.get("job_id")) for job in matched if isinstance(job, dict)}
+        missing = set(job_ids) - returned
+        if missing:
+            raise ValidationFailed(f"{len(missing)} of {len(job_ids)} jobs not scored")
+    return validate
+
+
+VALIDATORS = {
+    "email_status": validate_email_status,
+    "email_status_batch": validate_email_batch,
+    "email_validity": validate_email_validity,
+    "resume_parse": validate_resume,
+    "job_email": validate_json_object,
+    "resume_enhance": validate_enhanced_resume,
+}
+
+
+class ModelRouter:
+    """
+    run(task, call, size_text) calls `call(model)` on the task's tiers until an
+    output passes validation (the task's entry in VALIDATORS unless `validate`
+    is given) and returns that output; run_async() awaits `call(model)`.
+    `max_tiers` caps how many tiers one run may try (1 = no escalation, for
+    callers that escalate themselves). run_stream() does the same for
+    streamed calls.
+    """
+
+    def __init__(self, enabled, routes):
+        self.enabled = enabled
+        self.routes = routes
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def models_for(self, task, size_text="", escalate=0):
+        """
+        Model names to try for this task and input, cheapest first.
+        `escalate` starts that many tiers above the task's usual start.
+        """
+        if not self.enabled:
+            return [Config.MODEL]
+        start, upgrade_above = self.routes[task]
+        index = _TIER_NAMES.index(start) + escalate
+        if upgrade_above is not None and count_tokens(size_text) > upgrade_above:
+            index += 1
+        return [MODEL_TIERS[name] for name in _TIER_NAMES[min(index, len(_TIER_NAMES) - 1):]]
+
+    def cache_tag(self, task):
+        """
+        Stands in for the model name in cache keys of routed tasks.
+        """
+        if not self.enabled:
+            return Config.MODEL
+        return "router:" + ">".join(self.models_for(task)) + f":{self.routes[task][1]}"
+
+    def _record(self, task, tried, served, failures, exhausted):
+        with self._lock:
+            stats = self._stats.setdefault(task, {
+                "calls": 0, "escalated": 0, "escalations": 0, "exhausted": 0,
+                "started": {}, "served": {}, "validation_failures": {}, "last_failure": None,
+            })
+            stats["calls"] += 1
+            stats["escalated"] += len(tried) > 1
+            stats["escalations"] += len(tried) - 1
+            stats["exhausted"] += exhausted
+            stats["started"][tried[0]] = stats["started"].get(tried[0], 0) + 1
+            stats["served"][served] = stats["served"].get(served, 0) + 1
+            for model, reason in failures:
+                stats["validation_failures"][model] = stats["validation_failures"].get(model, 0) + 1
+                stats["last_failure"] = f"{model}: {reason}"
+
+    def _passes(self, task, validate, model, output, is_last, failures):
+        try:
+            validate(output)
+            return True
+        except ValidationFailed as e:
+            failures.append((model, str(e)))
+            if not is_last:
+                print(f"⤴️ {task}: {model} output rejected ({e}), escalating")
+            return False
+
+    def run(self, task, call, size_text="", validate=None, escalate=0, max_tiers=None):
+        validate = validate or VALIDATORS[task]
+        models = self.models_for(task, size_text, escalate)[:max_tiers]
+        tried, failures = [], []
+        for i, model in enumerate(models):
+            tried.append(model)
+            output = call(model)
+            if self._passes(task, validate, model, output, i == len(models) - 1, failures):
+                self._record(task, tried, model, failures, exhausted=False)
+                return output
+        self._record(task, tried, model, failures, exhausted=True)
+        return output
+
+    async def run_async(self, task, call, size_text="", validate=None, escalate=0, max_tiers=None):
+        validate = validate or VALIDATORS[task]
+        models = self.models_for(task, size_text, escalate)[:max_tiers]
+        tried, failures = [], []
+        for i, model in enumerate(models):
+            tried.append(model)
+            output = await call(model)
+            if self._passes(task, validate, model, output, i == len(models) - 1, failures):
+                self._record(task, tried, model, failures, exhausted=False)
+                return output
+        self._record(task, tried, model, failures, exhausted=True)
+        return output
+
+    async def run_stream(self, task, stream, result, size_text="", validate=None):
+        """
+        Streaming run_async: `stream(model)` is an async generator that yields
+        events and leaves the model's full output in result["text"]. Its events
+        are passed through tier by tier until an output passes validation;
+        result["valid"] tells whether the final output did.
+        """
+        validate = validate or VALIDATORS[task]
+        models = self.models_for(task, size_text)
+        tried, failures = [], []
+        for i, model in enumerate(models):
+            tried.append(model)
+            async for event in stream(model):
+                yield event
+            if self._passes(task, validate, model, result["text"], i == len(models) - 1, failures):
+                self._record(task, tried, model, failures, exhausted=False)
+                result["valid"] = True
+                return
+        self._record(task, tried, model, failures, exhausted=True)
+        result["valid"] = False
+
+    def stats(self):
+        with self._lock:
+            tasks = {}
+            for task, stats in self._stats.items():
+                tasks[task] = {
+                    **stats,
+                    "started": dict(stats["started"]),
+                    "served": dict(stats["served"]),
+                    "validation_failures": dict(stats["validation_failures"]),
+                    "escalation_rate": round(stats["escalated"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                }
+        return {"enabled": self.enabled, "tiers": MODEL_TIERS, "tasks": tasks}
+
+
+router = ModelRouter(enabled=Config.ROUTER_ENABLED, routes=TASK_ROUTES)
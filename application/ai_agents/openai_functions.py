@@ -1,15 +1,17 @@
 import json
-from openai import OpenAI
 from utils import config as Config
-
-
-client = OpenAI(api_key=Config.API_KEY)
+from ai_agents.llm_client import get_client, get_async_client
+from ai_agents.prompt_registry import with_schema
+from ai_agents.llm_resilience import resilience
+from ai_agents.rate_limiter import limiter
 
 
 def ask_with_instruction_json(
         instruction, message, model=Config.MODEL):  
-        client = OpenAI(api_key=Config.API_KEY)
-        chat_completion = client.chat.completions.create(
+        client = get_client()
+        chat_completion = resilience.call(
+            "ask_with_instruction_json", (instruction, message),
+            client.chat.completions.create,
             model=model,
             response_format={"type": "json_object"},
             messages=[
@@ -17,7 +19,6 @@ def ask_with_instruction_json(
                 {"role": "user", "content": message},
             ] 
         )
-
         out = chat_completion.choices[0].message.content
 
         # # ✅ Print usage if available
@@ -31,8 +32,10 @@ def ask_with_instruction_json(
 def ask_with_instruction(
         instruction, message, model=Config.MODEL, temperature=Config.TEMPERATURE
     ):  
-        client = OpenAI(api_key=Config.API_KEY)
-        chat_completion = client.chat.completions.create(
+        client = get_client()
+        chat_completion = resilience.call(
+            "ask_with_instruction", (instruction, message),
+            client.chat.completions.create,
             model=model,
             messages=[
                 {"role": "system", "content": instruction},
@@ -40,7 +43,6 @@ def ask_with_instruction(
             ],
             temperature=temperature,
         )
-
         out = chat_completion.choices[0].message.content
         return out
 
@@ -50,23 +52,23 @@ def ask_with_instruction(
 def parse_resume_as_structured(
     cv_text: json,
     system_instructions: str,
-    resume_schema: dict,
+    resume_schema: dict = None,
     model: str = Config.MODEL
 ):
-    client = OpenAI(api_key=Config.API_KEY)
+    client = get_client()
 
-    # Merge schema into system instructions
-    schema_instructions = f"""
-    You must output strictly valid JSON following this schema:
-    {json.dumps(resume_schema, indent=2)}
-    """
+    # Registry prompts (ai_agents.prompt_registry) already carry their schema
+    if resume_schema is not None:
+        system_instructions = with_schema(system_instructions, resume_schema)
 
-    response = client.responses.create(
+    response = resilience.call(
+        "parse_resume_as_structured", (system_instructions, str(cv_text)),
+        client.responses.create,
         model=model,
         input=[
             {
                 "role": "system",
-                "content": system_instructions + "\n\n" + schema_instructions
+                "content": system_instructions
             },
             {
                 "role": "user",
@@ -94,23 +96,23 @@ def enhance_resume_wrt_job(
     resume_json: str,
     job_json: str,
     system_instructions: str,
-    resume_schema: dict,
+    resume_schema: dict = None,
     model: str = Config.MODEL
 ):
-    client = OpenAI(api_key=Config.API_KEY)
+    client = get_client()
 
-    # Merge schema into system instructions
-    schema_instructions = f"""
-    You must output strictly valid JSON following this schema:
-    {json.dumps(resume_schema, indent=2)}
-    """
+    # Registry prompts (ai_agents.prompt_registry) already carry their schema
+    if resume_schema is not None:
+        system_instructions = with_schema(system_instructions, resume_schema)
 
-    response = client.responses.create(
+    response = resilience.call(
+        "enhance_resume_wrt_job", (system_instructions, resume_json, job_json),
+        client.responses.create,
         model=model,
         input=[
             {
                 "role": "system",
-                "content": system_instructions + "\n\n" + schema_instructions
+                "content": system_instructions
             },
             {
                 "role": "user",
@@ -138,23 +140,23 @@ def enhance_resume_wrt_job(
 def enhance_resume_wrt_ai(
     resume_json: str,
     system_instructions: str,
-    resume_schema: dict,
+    resume_schema: dict = None,
     model: str = Config.MODEL
 ):
-    client = OpenAI(api_key=Config.API_KEY)
+    client = get_client()
 
-    # Merge schema into system instructions
-    schema_instructions = f"""
-    You must output strictly valid JSON following this schema:
-    {json.dumps(resume_schema, indent=2)}
-    """
+    # Registry prompts (ai_agents.prompt_registry) already carry their schema
+    if resume_schema is not None:
+        system_instructions = with_schema(system_instructions, resume_schema)
 
-    response = client.responses.create(
+    response = resilience.call(
+        "enhance_resume_wrt_ai", (system_instructions, resume_json),
+        client.responses.create,
         model=model,
         input=[
             {
                 "role": "system",
-                "content": system_instructions + "\n\n" + schema_instructions
+                "content": system_instructions
             },
             {
                 "role": "user",
@@ -179,8 +181,178 @@ def enhance_resume_wrt_ai(
 
 
 
+# -----------------------------
+# Async variants (shared AsyncOpenAI client, safe to await from FastAPI handlers)
+# -----------------------------
+async def ask_with_instruction_json_async(
+        instruction, message, model=Config.MODEL):
+        client = get_async_client()
+        chat_completion = await resilience.call_async(
+            "ask_with_instruction_json", (instruction, message),
+            client.chat.completions.create,
+            model=model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": message},
+            ]
+        )
+        return chat_completion.choices[0].message.content
+
+
+async def ask_with_instruction_async(
+        instruction, message, model=Config.MODEL, temperature=Config.TEMPERATURE
+    ):
+        client = get_async_client()
+        chat_completion = await resilience.call_async(
+            "ask_with_instruction", (instruction, message),
+            client.chat.completions.create,
+            model=model,
+            messages=[
+                {"role": "system", "content": instruction},
+                {"role": "user", "content": message},
+            ],
+            temperature=temperature,
+        )
+        return chat_completion.choices[0].message.content
+
+
+
+
+async def parse_resume_as_structured_async(
+    cv_text: json,
+    system_instructions: str,
+    resume_schema: dict = None,
+    model: str = Config.MODEL
+):
+    client = get_async_client()
+
+    # Registry prompts (ai_agents.prompt_registry) already carry their schema
+    if resume_schema is not None:
+        system_instructions = with_schema(system_instructions, resume_schema)
+
+    response = await resilience.call_async(
+        "parse_resume_as_structured", (system_instructions, str(cv_text)),
+        client.responses.create,
+        model=model,
+        input=[
+            {
+                "role": "system",
+                "content": system_instructions
+            },
+            {
+                "role": "user",
+                "content": f"{cv_text}"
+            }
+        ]
+    )
+
+    print("Token usage:", response.usage)
+
+    return response.output_text
+
+
+
+
+async def enhance_resume_wrt_job_async(
+    resume_json: str,
+    job_json: str,
+    system_instructions: str,
+    resume_schema: dict = None,
+    model: str = Config.MODEL
+):
+    client = get_async_client()
+
+    # Registry prompts (ai_agents.prompt_registry) already carry their schema
+    if resume_schema is not None:
+        system_instructions = with_schema(system_instructions, resume_schema)
+
+    response = await resilience.call_async(
+        "enhance_resume_wrt_job", (system_instructions, resume_json, job_json),
+        client.responses.create,
+        model=model,
+        input=[
+            {
+                "role": "system",
+                "content": system_instructions
+            },
+            {
+                "role": "user",
+                "content": resume_json + "\n\n" + job_json
+            }
+        ]
+    )
+
+    if hasattr(response, "usage"):
+        print(json.dumps(response.usage.model_dump(), indent=2))
 
+    return response.output_text
 
 
 
 
+async def enhance_resume_wrt_ai_async(
+    resume_json: str,
+    system_instructions: str,
+    resume_schema: dict = None,
+    model: str = Config.MODEL
+):
+    client = get_async_client()
+
+    # Registry prompts (ai_agents.prompt_registry) already carry their schema
+    if resume_schema is not None:
+        system_instructions = with_schema(system_instructions, resume_schema)
+
+    response = await resilience.call_async(
+        "enhance_resume_wrt_ai", (system_instructions, resume_json),
+        client.responses.create,
+        model=model,
+        input=[
+            {
+                "role": "system",
+                "content": system_instructions
+            },
+            {
+                "role": "user",
+                "content": resume_json
+            }
+        ]
+    )
+
+    if hasattr(response, "usage"):
+        print(json.dumps(response.usage.model_dump(), indent=2))
+
+    return response.output_text
+
+
+
+
+async def stream_output_text_async(
+    system_instructions: str,
+    user_content: str,
+    model: str = Config.MODEL
+):
+    """
+    Same request as the structured/enhance calls above, with stream=True:
+    yields output text deltas as the model produces them.
+    """
+    client = get_async_client()
+
+    # the slot is held until the stream is drained (or the client goes away)
+    async with limiter.call_async(system_instructions, user_content) as call:
+        stream = await client.responses.create(
+            model=model,
+            input=[
+                {"role": "system", "content": system_instructions},
+                {"role": "user", "content": user_content},
+            ],
+            stream=True,
+            timeout=Config.LLM_ATTEMPT_TIMEOUT,  # per read; a stalled stream is cut off
+        )
+
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                yield event.delta
+            elif event.type == "response.completed" and event.response.usage:
+                call.usage = event.response.usage
+                print("Token usage:", event.response.usage)
@@ -0,0 +1,137 @@
+import json
+import re
+import threading
+from utils.token_count import count_tokens
+from utils import config as Config
+
+
+# -----------------------------
+# Prompt payload compaction
+# -----------------------------
+# Resume and job objects are projected down to the fields a task reads,
+# emptied of blank values and repeated text, and serialized as minified JSON
+# before they go into a prompt. Every call records tokens before/after.
+
+# Resume sections each task reads (None = all)
+RESUME_SECTIONS = {
+    "match": ("aboutMe", "professionalSkills", "tags", "workExperience", "workProjects", "education"),
+    "email": ("personalInfo", "aboutMe", "professionalSkills", "workExperience", "workProjects", "education"),
+    "enhance": ("aboutMe", "professionalSkills", "workExperience", "workProjects"),
+    "enhance_ai": None,
+}
+
+# Tasks whose output mirrors the input structure: keys are kept even when empty
+PRESERVE_STRUCTURE_TASKS = {"enhance_ai"}
+
+# Job keys that never help the model: bookkeeping, media and URLs.
+# `_id` stays (the matcher echoes it back as job_id), so does employerId (used by the email job_id).
+JOB_DROPPED_KEYS = {"__v", "createdAt", "updatedAt", "deletedAt", "userId", "logo", "image", "images", "url", "link", "slug"}
+
+DEDUPE_MIN_CHARS = 40  # repeated strings at least this long are sent once per entry
+
+_WHITESPACE_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def _clean_text(text):
+    text = _WHITESPACE_RE.sub(" ", text.replace("\r", ""))
+    return _BLANK_LINES_RE.sub("\n", text).strip()
+
+
+def _prune(value, seen, dropped_keys=()):
+    """
+    Recursively drop empty values, squeeze whitespace, drop duplicate list
+    items and long strings already emitted elsewhere in the same entry.
+    Each object in a list (a job posting, a work experience) is its own
+    entry: two postings with the same description both keep it.
+    Returns None for anything that ends up empty.
+    """
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            if key in dropped_keys:
+                continue
+            item = _prune(item, seen)
+            if item is not None:
+                out[key] = item
+        return out or None
+
+    if isinstance(value, (list, tuple)):
+        out = []
+        keys = set()
+        for item in value:
+            item = _prune(item, set() if isinstance(item, dict) else seen)
+            if item is None:
+                continue
+            key = json.dumps(item, sort_keys=True) if isinstance(item, (dict, list)) else str(item).lower()
+            if key not in keys:
+                keys.add(key)
+                out.append(item)
+        return out or None
+
+    if isinstance(value, str):
+        text = _clean_text(value)
+        if not text:
+            return None
+        if len(text) >= DEDUPE_MIN_CHARS:
+            if text in seen:
+                return None
+            seen.add(text)
+        return text
+
+    return value
+
+
+def minify(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def compact_resume(resume_json, task):
+    sections = RESUME_SECTIONS[task]
+    if sections is not None:
+        resume_json = {key: resume_json[key] for key in sections if key in resume_json}
+    if task in PRESERVE_STRUCTURE_TASKS:
+        return resume_json
+    return _prune(resume_json, set()) or {}
+
+
+def compact_job(job_json):
+    if isinstance(job_json, list):  # endpoints that take job_json accept a list of postings too
+        return compact_jobs(job_json)
+    return _prune(job_json, set(), JOB_DROPPED_KEYS) or {}
+
+
+def compact_jobs(jobs_json):
+    return [compact_job(job) for job in jobs_json]
+
+
+# -----------------------------
+# Savings accounting
+# -----------------------------
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_savings(task, original, compacted):
+    """
+    Count tokens of the payload text as it used to be sent vs now, log it and
+    add it to the per-task totals. Returns the tokens saved.
+    """
+    if not Config.PROMPT_COMPACTION_STATS:
+        return 0
+    before, after = count_tokens(original), count_tokens(compacted)
+    with _stats_lock:
+        totals = _stats.setdefault(task, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+        totals["calls"] += 1
+        totals["tokens_before"] += before
+        totals["tokens_after"] += after
+    print(f"🗜️ {task} payload: {before} → {after} tokens ({before - after} saved)")
+    return before - after
+
+
+def compaction_stats():
+    with _stats_lock:
+        return {
+            task: {**totals, "tokens_saved": totals["tokens_before"] - totals["tokens_after"]}
+            for task, totals in _stats.items()
+        }
@@ -0,0 +1,127 @@
+import hashlib
+from ai_agents import prompts_n_keys, structured_prompt_n_keys, enhanced_resume_prompts
+from ai_agents.payload_compaction import minify
+from utils.token_count import count_tokens
+from utils import config as Config
+
+
+# -----------------------------
+# Versioned prompt registry
+# -----------------------------
+# Every prompt the service sends is registered here once, at import time.
+# The static part (instructions, schema, output keys) is rendered up front
+# into `prefix`, which is byte-identical on every call so the provider's
+# prompt cache can reuse it; per-call values only ever go into `suffix`,
+# after the prefix. `content_hash` covers name, version and text, so caches
+# and metrics keyed on it roll over by themselves when a prompt changes.
+# Bump `version` for behavioural changes that keep the text identical.
+
+class PromptTemplate:
+
+    def __init__(self, name, version, prefix, suffix=""):
+        self.name = name
+        self.version = version
+        self.prefix = prefix
+        self.suffix = suffix
+        self.content_hash = hashlib.sha256(f"{name}\0{version}\0{prefix}\0{suffix}".encode("utf-8")).hexdigest()[:16]
+
+    def render(self, **values):
+        if not self.suffix:
+            return self.prefix
+        return self.prefix + self.suffix.format(**values)
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "version": self.version,
+            "content_hash": self.content_hash,
+            "prefix_tokens": count_tokens(self.prefix),
+        }
+
+
+_registry = {}
+
+
+def register(name, version, prefix, suffix=""):
+    prompt = PromptTemplate(name, version, prefix, suffix)
+    _registry[name] = prompt
+    return prompt
+
+
+def get_prompt(name):
+    return _registry[name]
+
+
+def list_prompts():
+    return [prompt.describe() for prompt in _registry.values()]
+
+
+def with_schema(instructions, schema):
+    return instructions + "\n\nYou must output strictly valid JSON following this schema:\n" + minify(schema) + "\n"
+
+
+# -----------------------------
+# Registered prompts
+# -----------------------------
+def match_weights():
+    return {
+        "skills_weightage": Config.skills_weightage,
+        "work_experience_weightage": Config.work_experience_weightage,
+        "projects_weightage": Config.projects_weightage,
+        "qualification_weightage": Config.qualification_weightage,
+    }
+
+
+_MATCH_PAYLOAD = """
+Resume:
+{resume_json}
+
+Job Descriptions:
+{jobs_json}
+"""
+
+register(
+    "resume_parse", 1,
+    with_schema(structured_prompt_n_keys.system_information, structured_prompt_n_keys.resume_schema),
+)
+
+_structured_head, _structured_tail = prompts_n_keys.structured_info.split("{cv_text}")
+register(
+    "resume_parse_text", 1,
+    _structured_head.format(output_keys=prompts_n_keys.output_keys, available_filters=prompts_n_keys.available_filters),
+    "{cv_text}" + _structured_tail,
+)
+
+register(
+    "resume_enhance_job", 1,
+    with_schema(structured_prompt_n_keys.enhance_cv_prompt, structured_prompt_n_keys.resume_schema),
+)
+
+register(
+    "resume_enhance_ai", 1,
+    with_schema(enhanced_resume_prompts.enhance_cv_via_ai.format(resume_json="(provided in the user message)"), structured_prompt_n_keys.resume_schema),
+)
+
+register(
+    "job_match_detailed", 2,
+    prompts_n_keys.job_match_detailed_instructions + "\nOutput keys:\n" + minify(prompts_n_keys.get_matching_score_json(**match_weights())) + "\n",
+    _MATCH_PAYLOAD,
+)
+
+register(
+    "job_match_compact", 1,
+    prompts_n_keys.job_match_compact_instructions + "\nOutput keys:\n" + minify(prompts_n_keys.get_matching_score_compact_json(**match_weights())) + "\n",
+    _MATCH_PAYLOAD,
+)
+
+register("job_email", 1, prompts_n_keys.job_email_prompt, prompts_n_keys.job_email_input)
+
+register("email_status", 2, prompts_n_keys.email_status_prompt, prompts_n_keys.email_status_input)
+
+register(
+    "email_status_batch", 1,
+    prompts_n_keys.email_status_prompt.split("### OUTPUT FORMAT:")[0] + prompts_n_keys.email_status_batch_output,
+    prompts_n_keys.email_status_batch_input,
+)
+
+register("email_validity", 1, prompts_n_keys.email_validity_prompt, prompts_n_keys.email_validity_input)
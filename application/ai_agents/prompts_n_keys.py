@@ -225,4 +225,212 @@ def get_matching_score_json(skills_weightage, work_experience_weightage, project
               ]
             }
 
-    return matching_output_json
\ No newline at end of file
+    return matching_output_json
+
+
+
+def get_matching_score_compact_json(skills_weightage, work_experience_weightage, projects_weightage, qualification_weightage):
+    """
+    Score-only variant of get_matching_score_json: ids and per-dimension numbers,
+    no requirement/candidate/notes text. Each value is the score out of its weightage.
+    """
+
+    if sum([skills_weightage, work_experience_weightage, projects_weightage, qualification_weightage]) != 100:
+        raise ValueError("Total weightage must be 100.")
+
+    matching_output_json = {
+            "matched_jobs": [
+                {
+                    "job_id": "",
+                    "skills": f"0-{skills_weightage}",
+                    "work_experience": f"0-{work_experience_weightage}",
+                    "projects": f"0-{projects_weightage}",
+                    "qualification": f"0-{qualification_weightage}"
+                }
+              ]
+            }
+
+    return matching_output_json
+
+
+
+# Job matcher instructions (output keys and the resume/jobs payload follow, see ai_agents.prompt_registry)
+job_match_detailed_instructions = """
+Given the following resume data and list of job descriptions, score every job against the resume and return
+all of them in matched_jobs with detailed matching scores in form of JSON. Each job's job_id is the job's _id.
+"""
+
+job_match_compact_instructions = """
+Given the following resume data and list of job descriptions, score every job against the resume.
+Return JSON only with the keys below: for each job its job_id (the job's _id) and an integer score per dimension
+within the given range. Do not include any explanations, titles or other text.
+"""
+
+
+
+job_email_prompt = """
+You are an expert HR copywriter and career coach. Given the **resume data** and **job description** at the end, write a job-application email that follows current best practices and professional standards.
+
+---
+
+### Requirements / Best Practices
+
+- Output must be valid JSON with exactly these keys:
+{
+    "job_id": "<employerId from job_data>",
+    "subject": "<email_subject>",
+    "email_content": "<email_body>"
+}
+
+- **Subject line**:
+* Must match *one of these formats*:
+    1. Application for [Job Title] – [Your Full Name]  
+    2. [Job Title] Position – [Your Name]  
+    3. [Your Name] – [Job Title] Application – [X+ Years Experience]  
+    4. Experienced [Role] Applying for [Role] Role – [Your Name]  
+    5. Application: [Role] – [Key qualifier] – [Your Name]  
+* Include the candidate’s name and job title (and job reference/ID if provided).  
+* Be clear, professional. Avoid vague or generic phrases.  
+* Keep concise (approx 6-10 words) so it isn’t truncated, especially on mobile.
+
+- **Salutation / Greeting**:
+* If hiring manager or contact person is known, address by name (“Dear Ms. Smith,” etc.).  
+* If not, “Dear Hiring Manager,” or similar formal greeting.
+
+- **Opening paragraph**:
+* State clearly which position you are applying for, and optionally where you found the listing.  
+* Introduce yourself briefly.
+
+- **Body**:
+* Highlight top 1-3 relevant skills, experiences, or achievements from the resume that map to requirements in the job description.  
+* Use specific examples (metrics, results if possible).  
+* Show alignment with the company or job (why this role, what you bring).
+
+- **Attachments and Documents**:
+* Mention that you’ve attached your resume (and cover letter if applicable).  
+* Use professional file names and suitable format (PDF if possible).
+
+- **Tone, Language, Style**:
+* Polite, formal, respectful; avoid slang, emojis, abbreviations.  
+* Use active voice.  
+* Proofread: grammar, spelling, consistency.
+
+- **Length / Structure**:
+* Body should be 3-4 short paragraphs. Total ~150-200 words.  
+* Use paragraph breaks for readability.
+
+- **Closing / Signature**:
+* Close with a courteous line (e.g. “Thank you for considering my application. I look forward to the possibility of discussing this opportunity.”)  
+* Include full name, email, phone number in signature.
+
+---
+
+### Example Output
+
+{
+"job_id": "98765",
+"subject": "Application for Marketing Manager – Jane Doe",
+"email_content": "Dear Hiring Manager,\\n\\nI am writing to apply for the Marketing Manager position at Acme Corp that I found on LinkedIn. With over six years of experience in digital marketing and campaign strategy, I have successfully increased customer acquisition by 40% at my current role through targeted social media and email campaigns.\\n\\nI believe these experiences align well with Acme’s goal to expand its online presence. I have attached my resume in PDF format for your review. Thank you for considering my application. I would welcome the opportunity to discuss further how I can contribute to your team.\\n\\nSincerely,\\nJane Doe\\n[jane.doe@example.com]\\n[+1-234-567-890]"
+}
+
+---
+"""
+
+job_email_input = """
+### Input
+
+**Resume Data:**  
+{resume_data}
+
+**Job Description:**  
+{job_data}
+"""
+
+
+
+email_status_prompt = """
+You are an assistant for an automated job application management system. 
+Your task is to classify incoming job application-related emails into one of four statuses 
+and generate a short, clear notification message for the candidate.
+
+### STATUS DEFINITIONS:
+- checked: The company has acknowledged, confirmed receipt, or reviewed the application 
+        (but no further action or decision is mentioned).
+- required: The company explicitly requests additional documents, actions, or information 
+            (e.g., resume, portfolio, certificates, references, ID proof, assessments, forms).
+            This status is ONLY used when the email contains a clear request for something specific. 
+            Be very careful to extract exactly what is requested from the email — no assumptions.
+- accepted: The application has been approved, shortlisted, the candidate is invited for 
+            interview/next round, or hired.
+- rejected: The application is declined or the candidate is not moving forward.
+
+### NOTIFICATION RULES:
+- Keep the notification very short, direct, and polite.
+- Always use second-person voice ("Your application...").
+- Examples:
+- checked → "Your application has been reviewed by the company."
+- required → "The company needs additional information: [insert requirement(s) exactly as stated in the email]."
+- accepted → "Congratulations! Your application has been accepted."
+- rejected → "We’re sorry, your application was not successful."
+- For **required status**, never summarize vaguely — copy the specific requirement(s) mentioned 
+(e.g., "updated resume", "two references", "portfolio link", "government ID copy").  
+If multiple requirements are listed, include all of them in the notification.
+
+### OUTPUT FORMAT:
+Respond ONLY with a JSON object that matches this schema:
+{
+"status": "checked" | "required" | "accepted" | "rejected",
+"notification": "string",
+"confidence": number between 0 and 1 (how certain you are of the status)
+}
+"""
+
+email_status_input = """
+Given Input Email Content: 
+{email_content}
+"""
+
+
+# Several emails per call (/classify-job-status/batch): same instructions, list in and out
+email_status_batch_output = """
+### OUTPUT FORMAT:
+You will receive a JSON list of emails, each {"id": "...", "email": "..."}. Classify every email on its own.
+Respond ONLY with a JSON object that matches this schema, with one entry per input id:
+{
+"results": [
+    {
+    "id": "the input id",
+    "status": "checked" | "required" | "accepted" | "rejected",
+    "notification": "string",
+    "confidence": number between 0 and 1 (how certain you are of the status)
+    }
+]
+}
+"""
+
+email_status_batch_input = """
+Given Input Emails:
+{emails_json}
+"""
+
+
+
+email_validity_prompt = """
+You are an AI email validator.
+
+Tasks:
+1. Identify what the company is asking for (requirements).
+2. Check if the user's response fulfills ALL requirements.
+3. Check if the user's response contains any spam, irrelevant, or promotional content.
+4. Return a JSON with:
+- status: "valid" if all requirements are fulfilled and no spam, otherwise "not valid"
+- description: short explanation of why it's valid or not.
+"""
+
+email_validity_input = """
+Company Email (request):
+\"\"\"{company_email_content}\"\"\"
+
+User Response:
+\"\"\"{user_response_content}\"\"\"
+"""
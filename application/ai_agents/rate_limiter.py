@@ -0,0 +1,415 @@
+import asyncio
+import contextvars
+import math
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager, asynccontextmanager
+import openai
+from utils.token_count import count_tokens
+from utils import config as Config
+
+
+# -----------------------------
+# Process-wide LLM rate limiter
+# -----------------------------
+# Every call in openai_functions waits here before it goes out. Two token
+# buckets (requests/min and tokens/min) refill continuously; one dispatcher
+# thread grants waiting calls strictly by priority class, FIFO within a class,
+# so a bulk /match-jobs-db/ run queues behind anyone waiting on a resume.
+# A call also needs one of the in-flight slots of the AIMD controller, which
+# sizes concurrency from what the provider tells us (429s, Retry-After,
+# x-ratelimit-* headers, timeouts).
+
+PRIORITY_CLASSES = ("interactive", "background")  # highest first
+
+_priority = contextvars.ContextVar("llm_priority", default=Config.LLM_DEFAULT_PRIORITY)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def _check_class(name):
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown LLM priority class '{name}', expected one of {PRIORITY_CLASSES}.")
+
+
+@contextmanager
+def llm_priority(name):
+    """
+    Run the enclosed LLM calls (and anything they spawn with the same context) in class `name`.
+    """
+    _check_class(name)
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMQueueTimeout(TimeoutError):
+    """Raised when a call is still waiting in the limiter queue after its `timeout`."""
+
+
+def llm_class(name):
+    """
+    Endpoint dependency declaring its LLM priority class:
+    @app.post(..., dependencies=[Depends(llm_class("interactive"))])
+    """
+    _check_class(name)
+
+    async def declare_llm_class():
+        _priority.set(name)  # async dependency: runs in the request's own context
+
+    return declare_llm_class
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, amount):
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value):
+    """
+    x-ratelimit-reset-* values ("1s", "6m0s", "20ms", "1h2m3.5s") -> seconds.
+    """
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            seconds = float(value)
+        except ValueError:
+            return None
+        return seconds if math.isfinite(seconds) and seconds >= 0 else None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_number(headers, name, cast=float):
+    # runs inside an httpx response hook: a malformed header must not fail the call
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_retry_after(headers):
+    """
+    Seconds from retry-after-ms or retry-after, or None when absent or unparseable.
+    """
+    retry_after_ms = _header_number(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    return parse_reset_duration(headers.get("retry-after"))
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight LLM calls.
+
+    Every successful response while the limit is in use adds 1/limit (about +1
+    per round of `limit` calls); a 429 or a timeout multiplies the limit by `decrease`, at most once
+    per `cooldown` seconds so one burst of throttling counts once. Retry-After
+    and exhausted x-ratelimit-remaining-* headers also pause new calls until
+    the provider says capacity is back.
+    """
+
+    def __init__(self, initial, minimum, maximum, decrease, cooldown, min_remaining_tokens):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.min_remaining_tokens = min_remaining_tokens
+
+        self.inflight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self.counts = {"increases": 0, "decreases": 0, "throttled": 0, "timeouts": 0, "pauses": 0}
+        self.remaining = {"requests": None, "tokens": None}
+
+    def can_start(self, now):
+        return self.inflight < int(self.limit) and now >= self.paused_until
+
+    def seconds_until_start(self, now):
+        return max(0.0, self.paused_until - now)
+
+    def on_success(self):
+        # only grow a limit that is actually being used
+        if self.limit < self.maximum and self.inflight >= int(self.limit) - 1:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.counts["increases"] += 1
+
+    def on_congestion(self, now, kind):
+        self.counts[kind] += 1
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._last_decrease = now
+            self.counts["decreases"] += 1
+
+    def pause(self, now, seconds):
+        if seconds and now + seconds > self.paused_until:
+            self.paused_until = now + seconds
+            self.counts["pauses"] += 1
+
+    def observe(self, now, status_code, headers):
+        """
+        Feed one HTTP response from the provider (status + headers).
+        """
+        retry_after = parse_retry_after(headers)
+
+        remaining_requests = _header_number(headers, "x-ratelimit-remaining-requests", int)
+        remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens", int)
+        if remaining_requests is not None:
+            self.remaining["requests"] = remaining_requests
+            if remaining_requests <= 0:
+                self.pause(now, parse_reset_duration(headers.get("x-ratelimit-reset-requests")))
+        if remaining_tokens is not None:
+            self.remaining["tokens"] = remaining_tokens
+            if remaining_tokens < self.min_remaining_tokens:
+                self.pause(now, parse_reset_duration(headers.get("x-ratelimit-reset-tokens")))
+
+        if status_code == 429:
+            self.on_congestion(now, "throttled")
+            self.pause(now, retry_after)
+        elif status_code < 400:
+            self.on_success()
+
+    def stats(self, now):
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "paused_for_s": round(self.seconds_until_start(now), 2),
+            "remaining_requests": self.remaining["requests"],
+            "remaining_tokens": self.remaining["tokens"],
+            **self.counts,
+        }
+
+
+class LLMRateLimiter:
+    """
+    Token-bucket limits on requests/min and tokens/min with priority classes,
+    plus an AIMDController for the number of calls in flight. A limit of 0
+    disables that bucket. Requests larger than the token bucket are clamped
+    to it so they can still go out once the bucket is full.
+
+    Use call() / call_async() around the request; they hold the slot until
+    the block exits and settle the token bucket with the real usage.
+    """
+
+    def __init__(self, rpm, tpm, concurrency, wait_samples=1000):
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = concurrency
+
+        self._cond = threading.Condition()
+        self._queues = {name: deque() for name in PRIORITY_CLASSES}  # name -> deque of (tokens, future, enqueued_at)
+        self._waits = {name: deque(maxlen=wait_samples) for name in PRIORITY_CLASSES}
+        self._granted = {name: 0 for name in PRIORITY_CLASSES}
+        self._thread = None
+
+    # ---- callers ----
+    def submit(self, tokens, priority=None, front=False) -> Future:
+        priority = priority or current_priority()
+        _check_class(priority)
+        future = Future()
+        with self._cond:
+            queue = self._queues[priority]
+            (queue.appendleft if front else queue.append)((tokens, future, time.perf_counter()))
+            self._ensure_dispatcher()
+            self._cond.notify_all()
+        return future
+
+    @contextmanager
+    def call(self, *texts, output_tokens=Config.LLM_OUTPUT_TOKEN_ESTIMATE, priority=None, front=False, timeout=None):
+        """
+        Block until a call with these prompt texts may go out, then hold its
+        slot for the duration of the block. Set `.usage` on the yielded
+        object so the token bucket is corrected from the real usage.
+        `front` puts it at the head of its class (hedged requests); after
+        `timeout` seconds in the queue it is withdrawn and LLMQueueTimeout raised.
+        """
+        slot = LLMCall(sum(count_tokens(text) for text in texts) + output_tokens)
+        future = self.submit(slot.tokens, priority, front)
+        try:
+            future.result(timeout=timeout)
+        except TimeoutError:
+            if not future.cancel():  # granted just as we gave up: give the slot back
+                future.result()
+                slot.reserved = self._reservation(slot.tokens)
+                self._finish(slot)
+            raise LLMQueueTimeout(f"no LLM slot within {timeout:.2f}s")
+        slot.reserved = self._reservation(slot.tokens)
+        timed_out = False
+        try:
+            yield slot
+        except openai.APITimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._finish(slot, timed_out)
+
+    @asynccontextmanager
+    async def call_async(self, *texts, output_tokens=Config.LLM_OUTPUT_TOKEN_ESTIMATE, priority=None, front=False, timeout=None):
+        slot = LLMCall(sum(count_tokens(text) for text in texts) + output_tokens)
+        future = self.submit(slot.tokens, priority, front)
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if not future.cancel():  # granted just as we were cancelled: give the slot back
+                slot.reserved = self._reservation(slot.tokens)
+                self._finish(slot)
+            if isinstance(e, asyncio.TimeoutError):
+                raise LLMQueueTimeout(f"no LLM slot within {timeout:.2f}s") from None
+            raise
+        slot.reserved = self._reservation(slot.tokens)
+        timed_out = False
+        try:
+            yield slot
+        except openai.APITimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._finish(slot, timed_out)
+
+    def _reservation(self, tokens):
+        # what a grant takes from the token bucket: the estimate, clamped to the bucket's size
+        return min(tokens, self._tokens.capacity) if self._tokens is not None else 0
+
+    def _finish(self, slot, timed_out=False):
+        total = getattr(slot.usage, "total_tokens", None)
+        with self._cond:
+            self.concurrency.inflight -= 1
+            if timed_out:
+                self.concurrency.on_congestion(time.monotonic(), "timeouts")
+            if self._tokens is not None and total is not None:
+                self._tokens.level = min(self._tokens.capacity, self._tokens.level + slot.reserved - total)
+            self._cond.notify_all()
+
+    def observe_response(self, status_code, headers):
+        """
+        httpx response hook target (see llm_client): rate-limit signals from every provider response.
+        """
+        with self._cond:
+            self.concurrency.observe(time.monotonic(), status_code, headers)
+            self._cond.notify_all()
+
+    # ---- dispatching ----
+    def _ensure_dispatcher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch_loop, name="llm-rate-limiter", daemon=True)
+            self._thread.start()
+
+    def _head(self):
+        for name in PRIORITY_CLASSES:
+            if self._queues[name]:
+                return name
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                name = self._head()
+                if name is None:
+                    self._cond.wait()
+                    continue
+
+                tokens, future, enqueued_at = self._queues[name][0]
+                if future.cancelled():  # caller gave up while queued
+                    self._queues[name].popleft()
+                    continue
+
+                now = time.monotonic()
+                if not self.concurrency.can_start(now):
+                    # woken by a finishing call; Retry-After pauses end by timeout
+                    self._cond.wait(timeout=self.concurrency.seconds_until_start(now) or None)
+                    continue
+
+                delay = 0.0
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill(now)
+                        delay = max(delay, bucket.seconds_until(amount))
+                if delay > 0:
+                    # a higher class arriving meanwhile wakes us and goes first
+                    self._cond.wait(timeout=delay)
+                    continue
+
+                self._queues[name].popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if self._requests is not None:
+                    self._requests.level -= 1
+                if self._tokens is not None:
+                    self._tokens.level -= self._reservation(tokens)
+                self.concurrency.inflight += 1
+                self._granted[name] += 1
+                self._waits[name].append(time.perf_counter() - enqueued_at)
+
+            future.set_result(None)
+
+    # ---- metrics ----
+    def stats(self):
+        with self._cond:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self._waits[name])
+                classes[name] = {
+                    "queued": sum(not future.cancelled() for _, future, _ in self._queues[name]),
+                    "granted": self._granted[name],
+                    "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                    "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                    "wait_ms_max": round(1000 * waits[-1], 2) if waits else 0.0,
+                }
+            return {
+                "requests_per_minute": self._requests.capacity if self._requests else None,
+                "tokens_per_minute": self._tokens.capacity if self._tokens else None,
+                "request_bucket": round(self._requests.level, 1) if self._requests else None,
+                "token_bucket": round(self._tokens.level) if self._tokens else None,
+                "concurrency": self.concurrency.stats(time.monotonic()),
+                "classes": classes,
+            }
+
+
+class LLMCall:
+
+    def __init__(self, tokens):
+        self.tokens = tokens  # estimate for this call
+        self.reserved = 0     # taken from the token bucket at grant: `tokens` clamped to its capacity
+        self.usage = None     # set by the caller from the response
+
+
+limiter = LLMRateLimiter(
+    rpm=Config.LLM_RPM_LIMIT,
+    tpm=Config.LLM_TPM_LIMIT,
+    concurrency=AIMDController(
+        initial=Config.LLM_AIMD_INITIAL,
+        minimum=Config.LLM_AIMD_MIN,
+        maximum=Config.LLM_AIMD_MAX,
+        decrease=Config.LLM_AIMD_DECREASE,
+        cooldown=Config.LLM_AIMD_COOLDOWN,
+        min_remaining_tokens=Config.LLM_OUTPUT_TOKEN_ESTIMATE,
+    ),
+)
@@ -1,19 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import os
-import shutil
 import time
 import json
+import asyncio
+import zipfile
+from contextlib import nullcontext
 from fastapi import Form
-from ai_agents import prompts_n_keys
-from ai_agents import structured_prompt_n_keys, enhanced_resume_prompts
-from ai_agents.openai_functions import enhance_resume_wrt_job, parse_resume_as_structured, enhance_resume_wrt_ai
-from ai_agents.openai_functions import ask_with_instruction_json
-from ai_agents.job_status import classify_email_status, check_validity_email
-from main_functions import get_resume_text
-from ai_agents.prompts_n_keys import get_matching_score_json
+from ai_agents.prompt_registry import get_prompt, list_prompts
+from ai_agents.openai_functions import enhance_resume_wrt_job_async, parse_resume_as_structured_async, enhance_resume_wrt_ai_async
+from ai_agents.openai_functions import ask_with_instruction_json_async, stream_output_text_async
+from ai_agents.job_status import classify_email_status, classify_email_statuses_async, check_validity_email
+from ai_agents.email_classifier import classifier_stats
+from main_functions import get_resume_text_from_bytes
+from ai_agents.job_matching import MATCH_MODES, MATCH_TASK, build_match_instructions, normalize_matched_jobs, match_job_ids
+from ai_agents.payload_compaction import compact_resume, compact_job, minify, record_savings, compaction_stats
 from extraction.apify_scraping import extract_profile_data
-from db_apis.fetch_jobs import process_jobs_in_batches
+from db_apis import match_queue
+from db_apis.job_index import get_job_index
+from db_apis.fetch_jobs import sync_job_index
+from ai_agents import llm_client
+from ai_agents.rate_limiter import limiter as llm_limiter, llm_class
+from ai_agents.llm_resilience import resilience as llm_resilience, LLMDeadlineExceeded
+from ai_agents.model_router import router as model_router, validate_match
+from utils.thread_pool import run_in_pool, shutdown_pool
+from ocr_module.ocr_scheduler import scheduler as ocr_scheduler, shutdown_ocr_pool, OCRQueueFull, run_waiting_for_ocr
+from utils.resume_cache import resume_cache, make_cache_key
+from utils.utils_functions import read_pdfs_from_zip, ZipTooLarge
+from utils.json_stream import JsonSectionParser
+from utils.token_count import tokenizer_available
 
 from utils import config as Config
 
@@ -23,14 +38,26 @@ from typing import List, Dict, Any
 class MatchRequest(BaseModel):
     resume_json: Dict[str, Any]
     jobs_json: List[Dict[str, Any]]
+    mode: str = "detailed"  # or "compact": per-dimension scores only
 
 
 class MatchRequestDb(BaseModel):
     user_id: str
     resume_json: Dict[str, Any]
+    mode: str = Config.DB_MATCH_MODE
 
 
 
+class JobIndexSyncRequest(BaseModel):
+    user_id: str
+
+
+class JobIndexSearchRequest(BaseModel):
+    resume_json: Dict[str, Any]
+    k: int = 20
+    exclude_ids: List[str] = []
+
+
 class EnhanceRequest(BaseModel):
     resume_json: Dict[str, Any]
     job_json: Dict[str, Any]
@@ -40,12 +67,53 @@ class EnhancedRequest(BaseModel):
     resume_json: Dict[str, Any]
 
 
+class EmailBatchRequest(BaseModel):
+    emails: List[str]
+
+
 
 
 app = FastAPI()
 
-UPLOAD_DIR = "temp_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# LLM priority class per endpoint (ai_agents.rate_limiter); /match-jobs-db/ runs are background by default
+INTERACTIVE = [Depends(llm_class("interactive"))]
+BACKGROUND = [Depends(llm_class("background"))]
+
+
+
+@app.on_event("startup")
+async def warm_openai_clients():
+    if Config.OPENAI_WARM_ON_STARTUP:
+        # the sync handshake runs in the pool so a slow API never stalls the event loop
+        await asyncio.gather(run_in_pool(llm_client.warm_up), llm_client.warm_up_async())
+
+
+@app.on_event("startup")
+async def load_tokenizer():
+    tokenizer_available()  # warns once at startup when budgets run on estimates
+
+
+@app.on_event("startup")
+async def start_match_workers():
+    match_queue.start_workers()
+
+
+@app.on_event("shutdown")
+async def close_openai_clients():
+    await llm_client.close_clients()
+    match_queue.stop_workers()
+    shutdown_pool()
+    shutdown_ocr_pool()
+
+
+@app.exception_handler(OCRQueueFull)
+async def ocr_queue_full_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.exception_handler(LLMDeadlineExceeded)
+async def llm_deadline_handler(request, exc):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 
 @app.get("/")
@@ -63,26 +131,60 @@ async def detailed_health_check():
     }
 
 
+@app.get("/ocr/stats")
+async def ocr_stats():
+    return ocr_scheduler.stats()
+
+
+@app.get("/llm/limiter")
+async def llm_limiter_stats():
+    # Rate limit buckets and queue wait time per priority class
+    return llm_limiter.stats()
+
+
+@app.get("/llm/resilience")
+async def llm_resilience_stats():
+    # Retries, deadline misses, hedges and hedge wins, call latency per operation
+    return llm_resilience.stats()
+
+
+@app.get("/llm/routing")
+async def llm_routing_stats():
+    # Starting tier, serving tier and escalations per task
+    return model_router.stats()
+
+
+@app.get("/llm/email-classifier")
+async def llm_email_classifier_stats():
+    # Emails answered by the local classifier vs passed on to the LLM, and why
+    return classifier_stats()
+
+
+@app.get("/llm/prompts")
+async def llm_prompts():
+    # Registered prompts with the content hashes caches and metrics key on
+    return list_prompts()
+
+
+@app.get("/llm/payload-stats")
+async def llm_payload_stats():
+    # Prompt payload tokens before/after compaction, per task, since startup
+    return compaction_stats()
+
+
 
 # @app.post("/upload-resume/")
 async def upload_resume(file: UploadFile = File(...)):
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    temp_path = os.path.join(UPLOAD_DIR, file.filename)
-    print("temp_path:", temp_path)
-
-    # Save uploaded file temporarily
-    with open(temp_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    pdf_bytes = await file.read()
 
     try:
-        extracted_text = get_resume_text(temp_path)
+        extracted_text = await run_in_pool(get_resume_text_from_bytes, pdf_bytes)
         return PlainTextResponse(content=extracted_text, media_type="text/plain")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing the PDF: {str(e)}")
-    finally:
-        os.remove(temp_path)
    
 
 
@@ -98,53 +200,119 @@ async def parse_resume(cv_text: str = Form(...)):      # ⬅️  accept form fie
     and return structured JSON.
     """
 
-    cv_keys = ask_with_instruction_json(instruction=prompts_n_keys.structured_info.format(output_keys=prompts_n_keys.output_keys, available_filters=prompts_n_keys.available_filters,  cv_text=cv_text), message="extract data as json")
+    cv_keys = await ask_with_instruction_json_async(instruction=get_prompt("resume_parse_text").render(cv_text=cv_text), message="extract data as json")
     return JSONResponse(json.loads(cv_keys))
 
 
 
 @app.post(
     "/parse-resume-structured/",
+    dependencies=INTERACTIVE,
     summary="Parse raw resume text into structured openai response",
 )
 async def parse_resume_structure(file: UploadFile = File(...)):      # ⬅️  accept form field
 
-    start_total = time.perf_counter()
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    # ---- Part 1: Validation, Save, Extract ----
-    start_part1 = time.perf_counter()
+    pdf_bytes = await file.read()
 
+    cv_keys = await parse_pdf_resume(pdf_bytes)
+
+    print("processed: returning response")
+    
+    return JSONResponse(json.loads(cv_keys))
 
-    if not file.filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    temp_path = os.path.join(UPLOAD_DIR, file.filename)
 
-    # Save uploaded file temporarily
-    with open(temp_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+async def parse_pdf_resume(pdf_bytes, extract_limit=None, parse_limit=None, wait_for_ocr=False):
+    """
+    PDF bytes -> structured resume JSON string, served from the resume cache when possible.
+    `extract_limit` / `parse_limit` are optional semaphores bounding the OCR and LLM stages.
+    With `wait_for_ocr`, a full OCR queue makes extraction wait (on its own pool) instead of 503.
+    """
 
-    extracted_text = get_resume_text(temp_path)
+    # Same PDF + model routing + prompt/schema -> reuse the previous parse
+    cache_key = make_cache_key(pdf_bytes, model_router.cache_tag("resume_parse"), get_prompt("resume_parse").content_hash)
+    cached = await run_in_pool(resume_cache.get, cache_key)
+    if cached is not None:
+        print("processed: returning cached response")
+        return cached
 
-    end_part1 = time.perf_counter()
+    async with extract_limit or nullcontext():
+        extract = run_waiting_for_ocr if wait_for_ocr else run_in_pool
+        extracted_text = await extract(get_resume_text_from_bytes, pdf_bytes)
 
-    # ---- Part 2: Parsing ----
-    start_part2 = time.perf_counter()
+    async with parse_limit or nullcontext():
+        cv_keys = await model_router.run_async(
+            "resume_parse",
+            lambda model: parse_resume_as_structured_async(cv_text=extracted_text, system_instructions=get_prompt("resume_parse").prefix, model=model),
+            size_text=extracted_text,
+        )
 
-    cv_keys = parse_resume_as_structured(cv_text=extracted_text, system_instructions=structured_prompt_n_keys.system_information, resume_schema=structured_prompt_n_keys.resume_schema)
+    json.loads(cv_keys)  # only cache output that is valid JSON
+    await run_in_pool(resume_cache.set, cache_key, cv_keys)
 
-    end_part2 = time.perf_counter()
-    end_total = time.perf_counter()
+    return cv_keys
 
-    # ---- Print timings ----
-    # print(f"⏱ File validation + extraction took: {end_part1 - start_part1:.4f} sec")
-    # print(f"⏱ Parsing took: {end_part2 - start_part2:.4f} sec")
-    # print(f"⏱ Total time: {end_total - start_total:.4f} sec")
 
 
-    print("processed: returning response")
-    
-    return JSONResponse(json.loads(cv_keys))
+@app.post(
+    "/parse-resume-structured/batch/",
+    dependencies=BACKGROUND,
+    summary="Parse many resume PDFs (or zips of PDFs), streaming one NDJSON line per resume",
+)
+async def parse_resume_structure_batch(files: List[UploadFile] = File(...)):
+
+    items = []  # (filename, pdf_bytes, error)
+
+    for file in files:
+        data = await file.read()
+        name = file.filename or ""
+
+        if name.lower().endswith(".zip"):
+            try:
+                pdfs = read_pdfs_from_zip(
+                    data,
+                    max_bytes=int(Config.BATCH_MAX_ZIP_MB * 1024 * 1024),
+                    max_pdfs=Config.BATCH_MAX_ZIP_PDFS,
+                    max_unzipped_bytes=int(Config.BATCH_MAX_UNZIPPED_MB * 1024 * 1024),
+                )
+                items.extend((pdf_name, pdf_bytes, None) for pdf_name, pdf_bytes in pdfs)
+            except zipfile.BadZipFile:
+                items.append((name, None, "Invalid zip archive."))
+            except ZipTooLarge as e:
+                items.append((name, None, str(e)))
+        elif name.lower().endswith(".pdf"):
+            items.append((name, data, None))
+        else:
+            items.append((name, None, "Only PDF or zip files are supported."))
+
+    extract_limit = asyncio.Semaphore(Config.BATCH_EXTRACT_CONCURRENCY)
+    parse_limit = asyncio.Semaphore(Config.BATCH_PARSE_CONCURRENCY)
+
+    async def process(filename, pdf_bytes, error):
+        if error:
+            return {"filename": filename, "error": error}
+        try:
+            # a full OCR queue makes batch items wait their turn rather than fail with 503
+            cv_keys = await parse_pdf_resume(pdf_bytes, extract_limit, parse_limit, wait_for_ocr=True)
+            return {"filename": filename, "data": json.loads(cv_keys)}
+        except Exception as e:
+            print(f"❌ Error parsing {filename}:", str(e))
+            return {"filename": filename, "error": str(e)}
+
+    async def stream_results():
+        tasks = [asyncio.create_task(process(*item)) for item in items]
+        try:
+            # Emit each resume as soon as it finishes, not in upload order
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
 
 
@@ -152,6 +320,7 @@ async def parse_resume_structure(file: UploadFile = File(...)):      # ⬅️  a
 
 @app.post(
     "/parse-linkedin-structured/",
+    dependencies=INTERACTIVE,
     summary="Parse LinkedIn profile into structured openai response",
 )
 async def parse_linkedin_structure(profile_url: str): 
@@ -159,14 +328,18 @@ async def parse_linkedin_structure(profile_url: str):
     response = {"error_status": False, "error_message": "", "data": {}}
 
     try:
-        extracted_text = extract_profile_data(profile_url)
+        extracted_text = await run_in_pool(extract_profile_data, profile_url)
         print("extracted_text:", extracted_text)
     except Exception as e:
         response["error_status"] = True
         response["error_message"] = f"Error extracting the LinkedIn profile data: {str(e)}"
         return response
 
-    cv_keys = parse_resume_as_structured(cv_text=extracted_text, system_instructions=structured_prompt_n_keys.system_information, resume_schema=structured_prompt_n_keys.resume_schema)
+    cv_keys = await model_router.run_async(
+        "resume_parse",
+        lambda model: parse_resume_as_structured_async(cv_text=extracted_text, system_instructions=get_prompt("resume_parse").prefix, model=model),
+        size_text=extracted_text,
+    )
     response["data"] = json.loads(cv_keys)
     print("final response")
     return response
@@ -177,6 +350,7 @@ async def parse_linkedin_structure(profile_url: str):
 
 @app.post(
     "/enhance_resume_with_jobs/",
+    dependencies=INTERACTIVE,
     summary="Enhance resume according to job descriptions for AI search and AI apply",
 )
 async def enhance_resume_with_jobs(
@@ -188,29 +362,25 @@ async def enhance_resume_with_jobs(
     # Step 1: Parse input resume JSON
     resume_dict = json.loads(resume_json)
 
-    # Step 2: Extract subset to send to AI
-    resume_subset = {
-        "aboutMe": resume_dict.get("aboutMe", {}),
-        "professionalSkills": resume_dict.get("professionalSkills", {}),
-        "workExperience": resume_dict.get("workExperience", []),
-        "workProjects": resume_dict.get("workProjects", [])
-    }
-
-    resume_str = json.dumps(resume_subset, indent=2)
+    # Step 2: Extract subset to send to AI (compacted, minified)
+    resume_str, job_str = enhance_with_job_payload(resume_dict, json.loads(job_json))
 
     # Step 3: Call AI enhancement with job description
-    cv_keys = enhance_resume_wrt_job(
-        resume_json=resume_str,
-        job_json=job_json,
-        system_instructions=structured_prompt_n_keys.enhance_cv_prompt,
-        resume_schema=structured_prompt_n_keys.resume_schema
+    cv_keys = await model_router.run_async(
+        "resume_enhance",
+        lambda model: enhance_resume_wrt_job_async(
+            resume_json=resume_str,
+            job_json=job_str,
+            system_instructions=get_prompt("resume_enhance_job").prefix,
+            model=model,
+        ),
     )
 
     # Step 4: Parse AI response into dict
     updated_subset = json.loads(cv_keys)
 
     # Step 5: Merge updated subset back into full resume
-    for key in ["aboutMe", "professionalSkills", "workExperience", "workProjects"]:
+    for key in ENHANCED_SECTIONS:
         if key in updated_subset:
             resume_dict[key] = updated_subset[key]
 
@@ -223,6 +393,7 @@ async def enhance_resume_with_jobs(
 
 @app.post(
     "/enhance_resume_with_jobs_body/",
+    dependencies=INTERACTIVE,
     summary="Enhance resume according to job descriptions for AI search and AI apply",
 )
 async def enhance_resume_with_jobs_body(payload: EnhanceRequest):
@@ -232,30 +403,25 @@ async def enhance_resume_with_jobs_body(payload: EnhanceRequest):
     resume_dict = payload.resume_json
     job_dict = payload.job_json
 
-    # Step 2: Extract subset for AI enhancement
-    resume_subset = {
-        "aboutMe": resume_dict.get("aboutMe", {}),
-        "professionalSkills": resume_dict.get("professionalSkills", {}),
-        "workExperience": resume_dict.get("workExperience", []),
-        "workProjects": resume_dict.get("workProjects", [])
-    }
-
-    resume_str = json.dumps(resume_subset, indent=2)
-    job_str = json.dumps(job_dict, indent=2)
+    # Step 2: Extract subset for AI enhancement (compacted, minified)
+    resume_str, job_str = enhance_with_job_payload(resume_dict, job_dict)
 
     # Step 3: Call AI enhancement
-    cv_keys = enhance_resume_wrt_job(
-        resume_json=resume_str,
-        job_json=job_str,
-        system_instructions=structured_prompt_n_keys.enhance_cv_prompt,
-        resume_schema=structured_prompt_n_keys.resume_schema
+    cv_keys = await model_router.run_async(
+        "resume_enhance",
+        lambda model: enhance_resume_wrt_job_async(
+            resume_json=resume_str,
+            job_json=job_str,
+            system_instructions=get_prompt("resume_enhance_job").prefix,
+            model=model,
+        ),
     )
 
     # Step 4: Parse AI response
     updated_subset = json.loads(cv_keys)
 
     # Step 5: Merge subset back into full resume
-    for key in ["aboutMe", "professionalSkills", "workExperience", "workProjects"]:
+    for key in ENHANCED_SECTIONS:
         if key in updated_subset:
             resume_dict[key] = updated_subset[key]
 
@@ -264,19 +430,47 @@ async def enhance_resume_with_jobs_body(payload: EnhanceRequest):
 
 
 
+ENHANCED_SECTIONS = ["aboutMe", "professionalSkills", "workExperience", "workProjects"]
+
+
+def enhance_with_job_payload(resume_dict, job_dict):
+    """
+    Compacted, minified (resume subset, job) strings for the enhance-with-job prompt.
+    """
+    resume_subset = {
+        "aboutMe": resume_dict.get("aboutMe", {}),
+        "professionalSkills": resume_dict.get("professionalSkills", {}),
+        "workExperience": resume_dict.get("workExperience", []),
+        "workProjects": resume_dict.get("workProjects", [])
+    }
+
+    resume_str = minify(compact_resume(resume_dict, "enhance"))
+    job_str = minify(compact_job(job_dict))
+    record_savings("enhance", json.dumps(resume_subset, indent=2) + "\n\n" + json.dumps(job_dict, indent=2), resume_str + "\n\n" + job_str)
+
+    return resume_str, job_str
+
+
+
 @app.post(
     "/enhance_resume_ai/",
+    dependencies=INTERACTIVE,
     summary="Generate an AI-enhanced, ATS-optimized resume with professional improvements and missing data insights"
 )
 async def enhance_resume_with_jobs_body(payload: EnhancedRequest):
     import json
-    resume_str = json.dumps(payload.resume_json, indent=2)
-
-
-    cv_keys = enhance_resume_wrt_ai(
-        resume_json=resume_str,
-        system_instructions=enhanced_resume_prompts.enhance_cv_via_ai.format(resume_json=resume_str),
-        resume_schema=structured_prompt_n_keys.resume_schema
+    # Same keys as the input (the output mirrors them), minified; sent once as the user message
+    original_str = json.dumps(payload.resume_json, indent=2)
+    resume_str = minify(compact_resume(payload.resume_json, "enhance_ai"))
+    record_savings("enhance_ai", original_str + original_str, resume_str)
+
+    cv_keys = await model_router.run_async(
+        "resume_enhance",
+        lambda model: enhance_resume_wrt_ai_async(
+            resume_json=resume_str,
+            system_instructions=get_prompt("resume_enhance_ai").prefix,
+            model=model,
+        ),
     )
     return JSONResponse(json.loads(cv_keys))
 
@@ -285,6 +479,175 @@ async def enhance_resume_with_jobs_body(payload: EnhancedRequest):
 
 
 
+# -----------------------------
+# Streaming (SSE) variants
+# -----------------------------
+# Same work as the endpoints above, but the model output is streamed: the
+# client gets `progress` events while waiting, a `section` event for each
+# top-level resume key the moment it is complete, then `done` with the full
+# result (or `error`).
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def elapsed_ms(started):
+    return round(1000 * (time.perf_counter() - started))
+
+
+async def stream_llm_sections(task, system_instructions, user_content, started, result, size_text=""):
+    """
+    SSE events for one streamed LLM task, routed like the blocking endpoints:
+    the output is checked by the task's validator, and a rejected tier is
+    followed by an `escalating` progress event and the next tier's sections,
+    which replace the earlier ones. The full output text is left in
+    result["text"] and result["valid"] tells whether it passed.
+    """
+
+    async def stream(model):
+        if result.get("text") is not None:
+            yield sse_event("progress", {"stage": "escalating", "model": model, "elapsed_ms": elapsed_ms(started)})
+        async for event in stream_model_sections(system_instructions, user_content, model, started, result):
+            yield event
+
+    async for event in model_router.run_stream(task, stream, result, size_text=size_text):
+        yield event
+
+
+async def stream_model_sections(system_instructions, user_content, model, started, result):
+    parser = JsonSectionParser()
+    chunks = []
+    chars = 0
+    last_progress = time.perf_counter()
+
+    async for delta in stream_output_text_async(system_instructions, user_content, model=model):
+        chunks.append(delta)
+        chars += len(delta)
+
+        for key, value in parser.feed(delta):
+            yield sse_event("section", {"key": key, "value": value, "elapsed_ms": elapsed_ms(started)})
+
+        if time.perf_counter() - last_progress >= Config.SSE_PROGRESS_INTERVAL:
+            last_progress = time.perf_counter()
+            yield sse_event("progress", {"stage": "generating", "chars": chars, "elapsed_ms": elapsed_ms(started)})
+
+    result["text"] = "".join(chunks)
+
+
+@app.post(
+    "/parse-resume-structured/stream",
+    dependencies=INTERACTIVE,
+    summary="Parse a resume PDF, streaming each section as server-sent events",
+)
+async def parse_resume_structure_stream(file: UploadFile = File(...)):
+
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+
+    pdf_bytes = await file.read()
+    started = time.perf_counter()
+
+    async def events():
+        try:
+            cache_key = make_cache_key(pdf_bytes, model_router.cache_tag("resume_parse"), get_prompt("resume_parse").content_hash)
+            cached = await run_in_pool(resume_cache.get, cache_key)
+            if cached is not None:
+                data = json.loads(cached)
+                for key, value in data.items():
+                    yield sse_event("section", {"key": key, "value": value, "elapsed_ms": elapsed_ms(started)})
+                yield sse_event("done", {"data": data, "cached": True, "elapsed_ms": elapsed_ms(started)})
+                return
+
+            yield sse_event("progress", {"stage": "extracting", "elapsed_ms": elapsed_ms(started)})
+            extracted_text = await run_in_pool(get_resume_text_from_bytes, pdf_bytes)
+            yield sse_event("progress", {"stage": "generating", "chars": 0, "elapsed_ms": elapsed_ms(started)})
+
+            result = {}
+            async for event in stream_llm_sections("resume_parse", get_prompt("resume_parse").prefix, extracted_text, started, result, size_text=extracted_text):
+                yield event
+
+            data = json.loads(result["text"])
+            if result["valid"]:  # the cache is shared with /parse-resume-structured/
+                await run_in_pool(resume_cache.set, cache_key, result["text"])
+            yield sse_event("done", {"data": data, "cached": False, "elapsed_ms": elapsed_ms(started)})
+
+        except Exception as e:
+            print("❌ Error:", str(e))
+            yield sse_event("error", {"message": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+
+@app.post(
+    "/enhance_resume_with_jobs_body/stream",
+    dependencies=INTERACTIVE,
+    summary="Enhance resume for a job, streaming each section as server-sent events",
+)
+async def enhance_resume_with_jobs_body_stream(payload: EnhanceRequest):
+
+    resume_dict = payload.resume_json
+    resume_str, job_str = enhance_with_job_payload(resume_dict, payload.job_json)
+    started = time.perf_counter()
+
+    async def events():
+        try:
+            yield sse_event("progress", {"stage": "generating", "chars": 0, "elapsed_ms": elapsed_ms(started)})
+
+            result = {}
+            async for event in stream_llm_sections("resume_enhance", get_prompt("resume_enhance_job").prefix, resume_str + "\n\n" + job_str, started, result):
+                yield event
+
+            updated_subset = json.loads(result["text"])
+            for key in ENHANCED_SECTIONS:
+                if key in updated_subset:
+                    resume_dict[key] = updated_subset[key]
+            yield sse_event("done", {"data": resume_dict, "elapsed_ms": elapsed_ms(started)})
+
+        except Exception as e:
+            print("❌ Error:", str(e))
+            yield sse_event("error", {"message": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+
+@app.post(
+    "/enhance_resume_ai/stream",
+    dependencies=INTERACTIVE,
+    summary="AI-enhance a resume, streaming each section as server-sent events",
+)
+async def enhance_resume_ai_stream(payload: EnhancedRequest):
+
+    original_str = json.dumps(payload.resume_json, indent=2)
+    resume_str = minify(compact_resume(payload.resume_json, "enhance_ai"))
+    record_savings("enhance_ai", original_str + original_str, resume_str)
+    started = time.perf_counter()
+
+    async def events():
+        try:
+            yield sse_event("progress", {"stage": "generating", "chars": 0, "elapsed_ms": elapsed_ms(started)})
+
+            result = {}
+            async for event in stream_llm_sections("resume_enhance", get_prompt("resume_enhance_ai").prefix, resume_str, started, result):
+                yield event
+
+            yield sse_event("done", {"data": json.loads(result["text"]), "elapsed_ms": elapsed_ms(started)})
+
+        except Exception as e:
+            print("❌ Error:", str(e))
+            yield sse_event("error", {"message": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+
+
+
+
 # from linkedin_scraping import main
 
 # @app.post("/get-linkedin-profile/")
@@ -297,26 +660,27 @@ async def enhance_resume_with_jobs_body(payload: EnhancedRequest):
 
 
 
-@app.post("/match-jobs-form/")
+@app.post("/match-jobs-form/", dependencies=INTERACTIVE)
 async def call_openai_job_matcher(payload: MatchRequest):
     resume_json = payload.resume_json
     jobs_json = payload.jobs_json
 
-    instructions = f"""
-    Given the following resume data and list of job descriptions, return a list of matched jobs with detailed matching scores in form of JSON.
+    if payload.mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {MATCH_MODES}.")
 
-    Resume:
-    {resume_json}
+    instructions = build_match_instructions(resume_json, jobs_json, payload.mode)
 
-    Job Descriptions:
-    {jobs_json}
+    response = await model_router.run_async(
+        "job_match",
+        lambda model: ask_with_instruction_json_async(instructions, MATCH_TASK, model=model),
+        validate=validate_match(match_job_ids(jobs_json)),
+    )
+    response = json.loads(response)
 
-    Output keys:
-    {get_matching_score_json(skills_weightage=Config.skills_weightage, work_experience_weightage=Config.work_experience_weightage, projects_weightage=Config.projects_weightage, qualification_weightage=Config.qualification_weightage)}
-    """
+    if payload.mode == "compact":
+        response["matched_jobs"] = normalize_matched_jobs(response, payload.mode)
 
-    response = ask_with_instruction_json(instructions, "match jobs with resume data and return jobs")
-    return JSONResponse(json.loads(response))
+    return JSONResponse(response)
 
 
 
@@ -327,7 +691,11 @@ async def call_openai_job_matcher(payload: MatchRequestDb):
         user_id = payload.user_id
         resume_json = payload.resume_json
 
-        process_jobs_in_batches(user_id, resume_json, batch_size=Config.MAX_JOBS)
+        if payload.mode not in MATCH_MODES:
+            raise ValueError(f"mode must be one of {MATCH_MODES}.")
+
+        # Matching can take minutes; queue it and let the background workers run it
+        job_id = await run_in_pool(match_queue.enqueue, user_id, resume_json, batch_size=Config.MATCH_MAX_BATCH_JOBS, mode=payload.mode)
 
     except Exception as e:
         print("❌ Error:", str(e))
@@ -337,108 +705,87 @@ async def call_openai_job_matcher(payload: MatchRequestDb):
         return {"err_status": False, "err_message": f"{error_message}", "data":{"status": "failed"}}
 
 
-    return {"err_status": False, "err_message": "", "data":{"status": f"all jobs are processed using batch of 5 jobs"}}
-
-
+    return {"err_status": False, "err_message": "", "data":{"status": "queued", "job_id": job_id}}
 
 
-@app.post(
-    "/generate-job-email/",
-    summary="Generate email subject & content from CV + Job detail",
-)
-async def generate_job_email(job_json: str, resume_json: str):
-    instructions = """
-    You are an expert HR copywriter and career coach. Given the following **resume data** and **job description**, write a job-application email that follows current best practices and professional standards.
 
-    ---
+@app.get("/match-jobs-db/{job_id}")
+async def match_job_status(job_id: str):
+    status = await run_in_pool(match_queue.get_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Match job not found.")
+    return {"err_status": False, "err_message": "", "data": status}
 
-    ### Input
 
-    **Resume Data:**  
-    {resume_data}
 
-    **Job Description:**  
-    {job_data}
+@app.post("/match-jobs-db/{job_id}/cancel")
+async def cancel_match_job(job_id: str):
+    status = await run_in_pool(match_queue.cancel, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Match job not found.")
+    return {"err_status": False, "err_message": "", "data": status}
 
-    ---
 
-    ### Requirements / Best Practices
 
-    - Output must be valid JSON with exactly these keys:
-    {{
-        "job_id": "<employerId from job_data>",
-        "subject": "<email_subject>",
-        "email_content": "<email_body>"
-    }}
 
-    - **Subject line**:
-    * Must match *one of these formats*:
-        1. Application for [Job Title] – [Your Full Name]  
-        2. [Job Title] Position – [Your Name]  
-        3. [Your Name] – [Job Title] Application – [X+ Years Experience]  
-        4. Experienced [Role] Applying for [Role] Role – [Your Name]  
-        5. Application: [Role] – [Key qualifier] – [Your Name]  
-    * Include the candidate’s name and job title (and job reference/ID if provided).  
-    * Be clear, professional. Avoid vague or generic phrases.  
-    * Keep concise (approx 6-10 words) so it isn’t truncated, especially on mobile.
-
-    - **Salutation / Greeting**:
-    * If hiring manager or contact person is known, address by name (“Dear Ms. Smith,” etc.).  
-    * If not, “Dear Hiring Manager,” or similar formal greeting.
-
-    - **Opening paragraph**:
-    * State clearly which position you are applying for, and optionally where you found the listing.  
-    * Introduce yourself briefly.
+@app.post("/jobs-index/sync")
+async def sync_jobs_index(payload: JobIndexSyncRequest):
+    try:
+        counts = await run_in_pool(sync_job_index, payload.user_id)
+    except Exception as e:
+        print("❌ Error:", str(e))
+        return {"err_status": True, "err_message": f"Error during job index sync: {str(e)}", "data": {}}
 
-    - **Body**:
-    * Highlight top 1-3 relevant skills, experiences, or achievements from the resume that map to requirements in the job description.  
-    * Use specific examples (metrics, results if possible).  
-    * Show alignment with the company or job (why this role, what you bring).
+    return {"err_status": False, "err_message": "", "data": counts}
 
-    - **Attachments and Documents**:
-    * Mention that you’ve attached your resume (and cover letter if applicable).  
-    * Use professional file names and suitable format (PDF if possible).
 
-    - **Tone, Language, Style**:
-    * Polite, formal, respectful; avoid slang, emojis, abbreviations.  
-    * Use active voice.  
-    * Proofread: grammar, spelling, consistency.
 
-    - **Length / Structure**:
-    * Body should be 3-4 short paragraphs. Total ~150-200 words.  
-    * Use paragraph breaks for readability.
+@app.post("/jobs-index/search")
+async def search_jobs_index(payload: JobIndexSearchRequest):
+    """
+    Top-k most similar indexed job posts for a resume, from the local index only (no LLM).
+    """
+    index = get_job_index()
+    start = time.perf_counter()
+    hits = await run_in_pool(index.search_resume, payload.resume_json, k=payload.k, exclude_ids=payload.exclude_ids)
+    elapsed_ms = round(1000 * (time.perf_counter() - start), 2)
 
-    - **Closing / Signature**:
-    * Close with a courteous line (e.g. “Thank you for considering my application. I look forward to the possibility of discussing this opportunity.”)  
-    * Include full name, email, phone number in signature.
+    jobs = await run_in_pool(index.get_jobs, [job_id for job_id, _ in hits])
+    scores = dict(hits)
+    results = [{"job_id": job["_id"], "similarity": round(scores[job["_id"]], 4), "job": job} for job in jobs]
 
-    ---
+    return {"err_status": False, "err_message": "", "data": {"indexed": len(index), "search_ms": elapsed_ms, "results": results}}
 
-    ### Example Output
 
-    {{
-    "job_id": "98765",
-    "subject": "Application for Marketing Manager – Jane Doe",
-    "email_content": "Dear Hiring Manager,\\n\\nI am writing to apply for the Marketing Manager position at Acme Corp that I found on LinkedIn. With over six years of experience in digital marketing and campaign strategy, I have successfully increased customer acquisition by 40% at my current role through targeted social media and email campaigns.\\n\\nI believe these experiences align well with Acme’s goal to expand its online presence. I have attached my resume in PDF format for your review. Thank you for considering my application. I would welcome the opportunity to discuss further how I can contribute to your team.\\n\\nSincerely,\\nJane Doe\\n[jane.doe@example.com]\\n[+1-234-567-890]"
-    }}
 
-    ---
-    """
-    # Later format this with resume_data, job_data
+@app.post(
+    "/generate-job-email/",
+    dependencies=INTERACTIVE,
+    summary="Generate email subject & content from CV + Job detail",
+)
+async def generate_job_email(job_json: str, resume_json: str):
+    prompt = get_prompt("job_email")
 
     # job_json will be a dict in string form, so we parse it to extract job_id
     job_data = json.loads(job_json)
     resume_data = json.loads(resume_json)
 
-    formatted_instructions = instructions.format(
-        resume_data=json.dumps(resume_data, indent=2),
-        job_data=json.dumps(job_data, indent=2),
+    resume_str = minify(compact_resume(resume_data, "email"))
+    job_str = minify(compact_job(job_data))
+    record_savings("email", json.dumps(resume_data, indent=2) + json.dumps(job_data, indent=2), resume_str + job_str)
+
+    formatted_instructions = prompt.render(
+        resume_data=resume_str,
+        job_data=job_str,
     )
 
     message = "Write subject and email content for job application"
     
     # Call your OpenAI wrapper
-    response = ask_with_instruction_json(formatted_instructions, message)
+    response = await model_router.run_async(
+        "job_email",
+        lambda model: ask_with_instruction_json_async(formatted_instructions, message, model=model),
+    )
     
     # Attach job_id to final JSON
     response_json = json.loads(response)
@@ -449,7 +796,7 @@ async def generate_job_email(job_json: str, resume_json: str):
 
 
 
-@app.post("/classify-job-status")
+@app.post("/classify-job-status", dependencies=INTERACTIVE)
 def classify_email(
     email_content: str = Form(...)
     ):
@@ -459,7 +806,21 @@ def classify_email(
 
 
 
-@app.post("/check-validity-email")
+@app.post(
+    "/classify-job-status/batch",
+    dependencies=BACKGROUND,
+    summary="Classify many job application emails; results are in request order",
+)
+async def classify_emails_batch(payload: EmailBatchRequest):
+    if len(payload.emails) > Config.EMAIL_BATCH_MAX_EMAILS:
+        raise HTTPException(status_code=413, detail=f"At most {Config.EMAIL_BATCH_MAX_EMAILS} emails per request.")
+
+    results, stats = await classify_email_statuses_async(payload.emails)
+    return JSONResponse({"results": results, "stats": stats})
+
+
+
+@app.post("/check-validity-email", dependencies=INTERACTIVE)
 def check_email_validatity(
     company_email_content: str = Form(...),
     user_response_content: str = Form(...)
@@ -0,0 +1,110 @@
+"""
+Drive ScoreWriter against a local mock of the jobs API score endpoints.
+PUT /jobpost/updateScore answers 503 on the first attempt for `flaky_pct`
+percent of jobs (retried, then accepted) and 400 for `bad_pct` percent
+(not retried); POST /jobpost/bulkScore does the same per request. Every
+response takes `latency_ms`. Prints the writer's counts next to what the
+script expects, once per-job and once in bulk mode.
+
+    cd application
+    python -m db_apis.benchmark_score_writer [jobs] [flaky_pct] [bad_pct] [latency_ms]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockJobsAPI(BaseHTTPRequestHandler):
+    latency = 0.02
+    flaky = set()  # job ids that get one 503 before succeeding
+    bad = set()    # job ids that always get 400
+
+    _lock = threading.Lock()
+    attempts = {}
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _status_for(self, key, job_ids):
+        cls = type(self)
+        with cls._lock:
+            cls.requests += 1
+            cls.attempts[key] = cls.attempts.get(key, 0) + 1
+            first_attempt = cls.attempts[key] == 1
+        time.sleep(cls.latency)
+        if any(job_id in cls.bad for job_id in job_ids):
+            return 400
+        if first_attempt and any(job_id in cls.flaky for job_id in job_ids):
+            return 503
+        return 200
+
+    def do_PUT(self):
+        item = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        status = self._status_for(item["jobId"], [item["jobId"]])
+        self._reply(status, {"ok": status == 200})
+
+    def do_POST(self):
+        items = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["scores"]
+        job_ids = [item["jobId"] for item in items]
+        status = self._status_for(",".join(job_ids), job_ids)
+        self._reply(status, {"ok": status == 200})
+
+
+def _run(label, writer, jobs, expected):
+    MockJobsAPI.attempts, MockJobsAPI.requests = {}, 0
+    start = time.perf_counter()
+    for n in range(jobs):
+        writer.submit(f"job-{n}", n % 100, f"Job {n}")
+    counts = writer.close()
+    elapsed = time.perf_counter() - start
+
+    ok = counts == expected
+    print(f"{'✅' if ok else '❌'} {label}: {counts} in {elapsed:.2f}s over {MockJobsAPI.requests} requests (expected {expected})")
+    return ok
+
+
+def main(jobs=200, flaky_pct=10, bad_pct=2, latency_ms=20):
+    MockJobsAPI.latency = latency_ms / 1000
+    MockJobsAPI.flaky = {f"job-{n}" for n in range(jobs) if n % 100 < flaky_pct}
+    MockJobsAPI.bad = {f"job-{n}" for n in range(jobs) if 100 - bad_pct <= n % 100}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockJobsAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # must be set before utils.config builds the endpoint URLs
+    os.environ["VEHIRE_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("SCORE_WRITE_BACKOFF", "0.05")
+    from db_apis.score_writer import ScoreWriter
+
+    print(f"🧪 mock jobs API: {jobs} scores, {flaky_pct}% fail once with 503, {bad_pct}% rejected with 400, {latency_ms} ms latency")
+
+    flaky, bad = len(MockJobsAPI.flaky), len(MockJobsAPI.bad)
+    ok = _run("per job", ScoreWriter("mock-user", bulk_url=None), jobs,
+              {"succeeded": jobs - bad, "failed": bad, "retries": flaky})
+
+    # in bulk mode one flaky or bad job decides the whole chunk
+    bulk_size = 50
+    chunks = [[f"job-{n}" for n in range(i, min(i + bulk_size, jobs))] for i in range(0, jobs, bulk_size)]
+    bad_chunks = [chunk for chunk in chunks if any(job_id in MockJobsAPI.bad for job_id in chunk)]
+    flaky_chunks = [chunk for chunk in chunks if chunk not in bad_chunks and any(job_id in MockJobsAPI.flaky for job_id in chunk)]
+    failed = sum(len(chunk) for chunk in bad_chunks)
+    ok &= _run("bulk", ScoreWriter("mock-user", bulk_url=f"{os.environ['VEHIRE_API_BASE']}/jobpost/bulkScore", bulk_size=bulk_size), jobs,
+               {"succeeded": jobs - failed, "failed": failed, "retries": len(flaky_chunks)})
+
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:5]))
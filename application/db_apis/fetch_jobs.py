@@ -1,8 +1,12 @@
 import requests
 import json
 import time
-from ai_agents.prompts_n_keys import get_matching_score_json
-from ai_agents.openai_functions import ask_with_instruction_json
+import queue
+import threading
+from ai_agents.job_matching import BatchPacker, get_match_prompt, score_jobs
+from ai_agents.local_matching import prerank_jobs
+from db_apis.score_writer import ScoreWriter, get_session
+from db_apis.job_index import get_job_index
 
 from utils import config as Config
 
@@ -26,7 +30,7 @@ def get_unprocessed_jobs(user_id, page=1, limit=5):
     """
     Fetch Vehire public jobs for a user and return only unprocessed job posts.
     """
-    url = 'https://www.vehire.ai/api/job-applying/jobpost/getAllPublic'
+    url = Config.JOBS_LIST_URL
     params = {
         'page': page,
         'limit': limit,
@@ -35,7 +39,7 @@ def get_unprocessed_jobs(user_id, page=1, limit=5):
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = get_session().get(url, params=params, timeout=Config.SCORE_WRITE_TIMEOUT)
         response.raise_for_status()
         data = response.json()
 
@@ -54,70 +58,273 @@ def get_unprocessed_jobs(user_id, page=1, limit=5):
         return [], 1
 
 
+# -----------------------------
+# Local job index sync
+# -----------------------------
+def sync_job_index(user_id, limit=50):
+    """
+    Page through the whole public catalogue into the local job index and drop
+    postings that are no longer listed. Returns {upserted, removed, indexed}.
+    """
+    index = get_job_index()
+    seen = set()
+    page, total_pages = 1, 1
+
+    while page <= total_pages:
+        params = {'page': page, 'limit': limit, 'tags': '["Software"]', 'userId': user_id}
+        response = get_session().get(Config.JOBS_LIST_URL, params=params, timeout=Config.SCORE_WRITE_TIMEOUT)
+        response.raise_for_status()
+        data = response.json().get("data", {})
+
+        job_posts = data.get("jobPosts", [])
+        index.upsert(job_posts)
+        seen.update(str(job["_id"]) for job in job_posts)
+        total_pages = data.get("totalPages", 1)
+        page += 1
+
+    removed = index.remove(index.job_ids() - seen)
+    print(f"🗂️ Job index synced: {len(seen)} postings, {removed} removed")
+    return {"upserted": len(seen), "removed": removed, "indexed": len(index)}
+
+
+# -----------------------------
+# Job Processing Stages
+# -----------------------------
+def score_jobs_batch(resume_json, jobs_json, mode="detailed"):
+    """
+    Ask the LLM to score one batch of job posts against the resume.
+    """
+    return score_jobs(resume_json, jobs_json, mode=mode)
+
+
+_DONE = object()
+
+
 # -----------------------------
 # Job Processing Function
 # -----------------------------
-def process_jobs_in_batches(user_id, resume_json, batch_size=5):
+def process_jobs_in_batches(user_id, resume_json, batch_size=Config.MATCH_MAX_BATCH_JOBS, progress=None, concurrency=Config.MATCH_LLM_CONCURRENCY,
+                            mode=Config.DB_MATCH_MODE, prerank_top_n=Config.PRERANK_TOP_N, token_budget=Config.MATCH_TOKEN_BUDGET,
+                            retrieve_top_k=Config.MATCH_RETRIEVE_TOP_K):
     """
     Fetch all unprocessed jobs (page by page) and process them in batches.
+
+    Runs as three overlapping stages joined by queues: one thread fetches
+    pages and cuts them into batches, `concurrency` threads score batches
+    with the LLM, and a ScoreWriter pool writes scores back. Page 2 is fetched while
+    page 1 is still being scored, so total time tracks the slowest batches
+    rather than their sum.
+
+    With `prerank_top_n` set, every page is fetched first and scored locally
+    (ai_agents.local_matching); only the best `prerank_top_n` jobs go to the
+    LLM. The rest get their local score written back with
+    scoreSource="local", and fetching no longer overlaps scoring.
+
+    Every fetched page is upserted into the local job index
+    (db_apis.job_index). When pre-ranking, the index first retrieves the
+    `retrieve_top_k` unprocessed jobs most similar to the resume and only
+    those are pre-ranked for the LLM; the others are scored locally too.
+    If the index can't be updated, every job is pre-ranked instead.
+
+    Batches are packed by estimated tokens (ai_agents.job_matching.BatchPacker):
+    jobs are added until prompt + expected output would pass `token_budget`,
+    with `batch_size` as the hard cap on jobs per batch. Jobs from consecutive
+    pages share a batch when they fit. token_budget=0 gives fixed batches of
+    `batch_size`. Each batch's fill ratio is logged and reported to `progress`.
+
+    `mode` picks the matcher output: "compact" (per-dimension scores only,
+    much less output to generate) or "detailed" (full match_details).
+
+    `progress` is optional (see db_apis.match_queue.MatchProgress): it is told
+    about finished pages, packed batches, scored jobs and batch errors, and is
+    polled between batches so a queued run can be cancelled. Without it the
+    first error stops the run and is re-raised.
     """
-    page = 1
+    match_prompt = get_match_prompt(mode)
+    print(f"match prompt: {match_prompt.name} v{match_prompt.version} ({match_prompt.content_hash})")
 
-    match_score_criteria = get_matching_score_json(
-        skills_weightage=Config.skills_weightage,
-        work_experience_weightage=Config.work_experience_weightage,
-        projects_weightage=Config.projects_weightage,
-        qualification_weightage=Config.qualification_weightage
-    )
+    batch_q = queue.Queue(maxsize=concurrency * 2)  # backpressure on the fetcher
+    stop = threading.Event()
+    errors = []
+    lock = threading.Lock()
+    page_batches_left = {}
+    total_pages_seen = [1]
+    packer = BatchPacker(resume_json, mode, budget=token_budget, max_jobs=batch_size)
+    index_ok = [True]  # cleared when the local job index can't be updated
 
-    while True:
-        unprocessed_jobs, total_pages = get_unprocessed_jobs(user_id, page=page)
-        if not unprocessed_jobs:
-            break  # no more jobs
+    def should_stop():
+        if stop.is_set():
+            return True
+        if progress and progress.cancelled():
+            print("🛑 Matching cancelled")
+            stop.set()
+            return True
+        return False
 
-        print(f"\n📄 Page {page}/{total_pages} — Jobs fetched: {len(unprocessed_jobs)}")
-        print("match_score_criteria: ", match_score_criteria)
+    def record_error(e, label):
+        print(f"❌ {label} failed:", str(e))
+        if progress:
+            progress.error(str(e))
+        else:
+            with lock:
+                errors.append(e)
+            stop.set()
 
-        # Process jobs in batches
-        for i in range(0, len(unprocessed_jobs), batch_size):
-            jobs_json = unprocessed_jobs[i:i + batch_size]
-            print(f"\n🚀 Processing batch {i//batch_size + 1} (jobs {i+1}-{i+len(jobs_json)})")
+    def finish_batch(pages):
+        for page in pages:
+            with lock:
+                page_batches_left[page] -= 1
+                # jobs of the page may still be waiting in the packer for a later batch
+                page_finished = page_batches_left[page] == 0 and page not in packer.pending_tags()
+            if page_finished and progress:
+                progress.page_done(page, total_pages_seen[0])
 
-            instructions = f"""
-            Given the following resume data and list of job descriptions, return a list of matched jobs with detailed matching scores in form of JSON.
+    def enqueue_jobs(paged_jobs, final=False):
+        # paged_jobs: [(page, job)]. Packing and per-page batch counts happen under
+        # one lock so a fast batch can't report its page done while siblings are
+        # still pending or still sitting in the packer
+        batches = []
+        with lock:
+            for page, job in paged_jobs:
+                batches.extend(packer.add(job, page))
+            if final:
+                batches.extend(packer.flush())
+            for _, pages, _ in batches:
+                for page in set(pages):
+                    page_batches_left[page] = page_batches_left.get(page, 0) + 1
+            first_number = packer.batches - len(batches) + 1
 
-            Resume:
-            {resume_json}
+        for number, (jobs_json, pages, fill_ratio) in enumerate(batches, start=first_number):
+            label = f"batch {number}"
+            if fill_ratio is not None:
+                label += f" (fill {fill_ratio:.0%})"
+                if progress:
+                    progress.batch_packed(fill_ratio)
+            batch_q.put((label, set(pages), jobs_json))
 
-            Job Descriptions:
-            {jobs_json}
+    def index_page(jobs):
+        if not index_ok[0]:
+            return
+        try:
+            get_job_index().upsert(jobs)
+        except Exception as e:
+            print("⚠️ Job index update failed, pre-ranking every job:", str(e))
+            index_ok[0] = False
 
-            Output keys:
-            {match_score_criteria}
-            """
+    def retrieve_candidates(jobs):
+        # (candidates, rest): the index's top-k most similar jobs among those fetched
+        if not retrieve_top_k or len(jobs) <= retrieve_top_k or not index_ok[0]:
+            return jobs, []
+        hits = get_job_index().search_resume(resume_json, k=retrieve_top_k, within_ids={str(job["_id"]) for job in jobs})
+        retrieved = {job_id for job_id, _ in hits}
+        candidates = [job for job in jobs if str(job["_id"]) in retrieved]
+        return candidates, [job for job in jobs if str(job["_id"]) not in retrieved]
 
-            response = ask_with_instruction_json(instructions, "match jobs with resume data and return jobs")
-            response = json.loads(response)
+    def enqueue_shortlist(gathered):
+        jobs = [job for _, job in gathered]
+        page_of = {id(job): page for page, job in gathered}
 
-            for job in response["matched_jobs"]:
-                job_id = job["job_id"]
-                job_title = job.get("job_title", "N/A")
-                match_score = job.get("match_score", 0)
+        candidates, rest = retrieve_candidates(jobs)
+        shortlist, pruned = prerank_jobs(resume_json, candidates, top_n=prerank_top_n)
+        pruned += prerank_jobs(resume_json, rest, top_n=0)[1]
+        print(f"🔎 Pre-ranked {len(candidates)} of {len(jobs)} jobs → {len(shortlist)} to LLM, {len(pruned)} scored locally")
 
-                payload = {"user": user_id, "jobId": job_id, "jobScore": match_score}
-                headers = {"Content-Type": "application/json"}
+        for job, local_score in pruned:
+            writer.submit(job["_id"], local_score, job.get("title", "N/A"), source="local")
 
-                r = requests.put("https://www.vehire.ai/api/job-applying/jobpost/updateScore",
-                                 headers=headers, data=json.dumps(payload))
-                print(f"→ Updated {job_title} ({job_id}) → {r.status_code}")
+        enqueue_jobs([(page_of[id(job)], job) for job in shortlist], final=True)
 
-            print(f"✅ Completed batch {i//batch_size + 1}")
+        # Pages whose jobs were all pruned are already done
+        for page in sorted({page for page, _ in gathered}):
+            if page not in page_batches_left and progress:
+                progress.page_done(page, total_pages_seen[0])
 
-        if page >= total_pages:
-            break
-        page += 1
+    # ---- Stage 1: fetch pages ----
+    def fetch_pages():
+        page = 1
+        gathered = []  # (page, job) when pre-ranking
+        try:
+            while not should_stop():
+                unprocessed_jobs, total_pages = get_unprocessed_jobs(user_id, page=page)
+                if not unprocessed_jobs:
+                    break  # no more jobs
+
+                total_pages_seen[0] = total_pages
+                print(f"\n📄 Page {page}/{total_pages} — Jobs fetched: {len(unprocessed_jobs)}")
+                index_page(unprocessed_jobs)
+
+                if prerank_top_n:
+                    gathered.extend((page, job) for job in unprocessed_jobs)
+                else:
+                    enqueue_jobs([(page, job) for job in unprocessed_jobs])
+
+                if page >= total_pages:
+                    break
+                page += 1
+
+            if gathered and not should_stop():
+                enqueue_shortlist(gathered)
+            elif not prerank_top_n:
+                enqueue_jobs([], final=True)
+        except Exception as e:
+            record_error(e, f"Fetching page {page}")
+        finally:
+            for _ in range(concurrency):
+                batch_q.put(_DONE)
+
+    # ---- Stage 2: score batches ----
+    def score_batches():
+        while True:
+            item = batch_q.get()
+            if item is _DONE:
+                return
+
+            label, pages, jobs_json = item
+            if should_stop():
+                continue  # drain without scoring
+
+            print(f"\n🚀 Processing {label} ({len(jobs_json)} jobs)")
+            try:
+                for job in score_jobs_batch(resume_json, jobs_json, mode):
+                    writer.submit(job["job_id"], job.get("match_score", 0), job.get("job_title", "N/A"))
+                print(f"✅ Completed {label}")
+            except Exception as e:
+                record_error(e, label.capitalize())
+            finally:
+                finish_batch(pages)
+
+    # ---- Stage 3: write scores back (pooled, retried) ----
+    def on_write_result(job_ids, ok, error):
+        if not progress:
+            return
+        if ok:
+            progress.job_scored(len(job_ids))
+        else:
+            progress.error(f"Score update failed for {', '.join(map(str, job_ids))}: {error}")
+
+    writer = ScoreWriter(user_id, on_result=on_write_result)
+
+    fetcher = threading.Thread(target=fetch_pages, name="match-fetch")
+    scorers = [threading.Thread(target=score_batches, name=f"match-score-{n}") for n in range(concurrency)]
+
+    for thread in [fetcher, *scorers]:
+        thread.start()
+
+    fetcher.join()
+    for thread in scorers:
+        thread.join()
+    write_counts = writer.close()
+
+    packing = packer.summary()
+    print(f"📦 Batches: {packing['batches']}, avg fill {packing['avg_fill_ratio']}, min fill {packing['min_fill_ratio']}")
+
+    if errors:
+        raise errors[0]
+
+    if not stop.is_set():
+        print("🎯 All unprocessed jobs processed successfully!")
 
-    print("🎯 All unprocessed jobs processed successfully!")
+    return {**write_counts, **packing}
 
 
 
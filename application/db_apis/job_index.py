@@ -0,0 +1,258 @@
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+import numpy as np
+from ai_agents.local_matching import tokenize_list, job_text, resume_text
+from utils import config as Config
+
+
+# -----------------------------
+# Local vector index over job postings
+# -----------------------------
+# Each posting is embedded as a hashed, sublinear-TF vector (crc32 buckets, so
+# it is stable across processes), L2-normalized and stored as one row of a
+# memory-mapped float32 matrix. Document frequencies per bucket are kept
+# incrementally; IDF is applied on the query side at search time, so adding
+# or removing postings never requires re-embedding the rest.
+#
+# Layout in JOB_INDEX_DIR:
+#   vectors.f32  - (capacity, dim) float32 memmap, one row per slot
+#   df.npy       - per-bucket document frequency
+#   jobs.sqlite3 - job_id -> slot + the posting JSON
+#   index.lock   - flock held by writers (exclusive) and reloads (shared), so
+#                  several processes (uvicorn / match workers) can share the index
+
+
+def embed_text(text, dim=Config.JOB_INDEX_DIM):
+    tokens = tokenize_list(text)
+    vec = np.zeros(dim, dtype=np.float32)
+    if not tokens:
+        return vec
+    buckets = np.fromiter((zlib.crc32(t.encode("utf-8")) % dim for t in tokens), dtype=np.int64, count=len(tokens))
+    counts = np.bincount(buckets, minlength=dim).astype(np.float32)
+    np.log1p(counts, out=vec)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class JobIndex:
+
+    def __init__(self, index_dir=Config.JOB_INDEX_DIR, dim=Config.JOB_INDEX_DIM, initial_capacity=1024):
+        self.index_dir = index_dir
+        self.dim = dim
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._vectors_path = os.path.join(index_dir, "vectors.f32")
+        self._df_path = os.path.join(index_dir, "df.npy")
+        self._db_path = os.path.join(index_dir, "jobs.sqlite3")
+        self._lock_path = os.path.join(index_dir, "index.lock")
+        self._initial_capacity = initial_capacity
+        self._vectors = None
+
+        with self._file_lock(fcntl.LOCK_EX):
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, doc TEXT NOT NULL)")
+            self._load()
+
+    @contextmanager
+    def _file_lock(self, kind):
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, kind)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        """
+        (Re)read slots, document frequencies and the vector file from disk; call with the file lock held.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT job_id, slot FROM jobs").fetchall()
+
+        self._slot_of = {job_id: slot for job_id, slot in rows}
+        self._id_at = {slot: job_id for job_id, slot in rows}
+
+        capacity = self._initial_capacity
+        if os.path.exists(self._vectors_path):
+            capacity = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        capacity = max(capacity, self._initial_capacity, max(self._id_at, default=-1) + 1)
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = self._open_vectors(capacity)
+
+        self._df = np.load(self._df_path) if os.path.exists(self._df_path) else np.zeros(self.dim, dtype=np.float32)
+        self._df_mtime = os.path.getmtime(self._df_path) if os.path.exists(self._df_path) else None
+        self._free = sorted(set(range(capacity)) - set(self._id_at), reverse=True)
+
+    @contextmanager
+    def _writing(self):
+        # another process may have written since we last loaded: start from what is on disk
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._load()
+            yield
+
+    def _refresh(self):
+        # cheap staleness check for readers: every write re-saves df.npy
+        mtime = os.path.getmtime(self._df_path) if os.path.exists(self._df_path) else None
+        if mtime != self._df_mtime:
+            with self._file_lock(fcntl.LOCK_SH):
+                self._load()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _open_vectors(self, capacity):
+        mode = "r+" if os.path.exists(self._vectors_path) else "w+"
+        if mode == "r+" and os.path.getsize(self._vectors_path) < capacity * self.dim * 4:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(capacity * self.dim * 4)  # grows with zero rows
+        return np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    def _grow(self):
+        old_capacity = self._vectors.shape[0]
+        self._vectors.flush()
+        del self._vectors
+        self._vectors = self._open_vectors(old_capacity * 2)
+        self._free = sorted(set(self._free) | set(range(old_capacity, old_capacity * 2)), reverse=True)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._slot_of)
+
+    # ---- updates ----
+    def _drop_slot(self, slot):
+        self._df -= self._vectors[slot] > 0
+        self._vectors[slot] = 0
+        self._free.append(slot)
+
+    def upsert(self, jobs):
+        """
+        Add or refresh postings (keyed by `_id`). Returns the number written.
+        """
+        rows = []
+        with self._writing():
+            for job in jobs:
+                job_id = str(job.get("_id", ""))
+                if not job_id:
+                    continue
+
+                vec = embed_text(job_text(job), self.dim)
+                slot = self._slot_of.get(job_id)
+                if slot is not None:
+                    self._df -= self._vectors[slot] > 0
+                else:
+                    if not self._free:
+                        self._grow()
+                    slot = self._free.pop()
+                    self._slot_of[job_id] = slot
+                    self._id_at[slot] = job_id
+
+                self._vectors[slot] = vec
+                self._df += vec > 0
+                rows.append((job_id, slot, json.dumps(job)))
+
+            if rows:
+                with self._connect() as conn:
+                    conn.executemany("INSERT OR REPLACE INTO jobs (job_id, slot, doc) VALUES (?, ?, ?)", rows)
+                self._flush()
+        return len(rows)
+
+    def remove(self, job_ids):
+        removed = []
+        with self._writing():
+            for job_id in job_ids:
+                slot = self._slot_of.pop(str(job_id), None)
+                if slot is None:
+                    continue
+                del self._id_at[slot]
+                self._drop_slot(slot)
+                removed.append((str(job_id),))
+
+            if removed:
+                with self._connect() as conn:
+                    conn.executemany("DELETE FROM jobs WHERE job_id = ?", removed)
+                self._flush()
+        return len(removed)
+
+    def _flush(self):
+        self._vectors.flush()
+        np.save(self._df_path, self._df)
+        self._df_mtime = os.path.getmtime(self._df_path)
+
+    # ---- queries ----
+    def search_text(self, text, k=20, exclude_ids=(), within_ids=None):
+        """
+        Top-k postings for a free-text query as [(job_id, score)], best first.
+        `within_ids` limits the search to those postings.
+        """
+        if k <= 0:
+            return []
+        with self._lock:
+            self._refresh()
+            n = len(self._slot_of)
+            if not n:
+                return []
+
+            idf = np.log((1 + n) / (1 + self._df)) + 1
+            query = embed_text(text, self.dim) * idf * idf
+            norm = np.linalg.norm(query)
+            if not norm:
+                return []
+
+            scores = self._vectors @ (query / norm)  # free slots are zero rows
+            excluded = {self._slot_of[j] for j in exclude_ids if j in self._slot_of}
+            if within_ids is None:
+                active = np.fromiter(self._id_at, dtype=np.int64)
+            else:
+                active = np.array(sorted({self._slot_of[j] for j in within_ids if j in self._slot_of}), dtype=np.int64)
+            if excluded:
+                active = active[~np.isin(active, list(excluded))]
+            if not len(active):
+                return []
+
+            k = min(k, len(active))
+            top = active[np.argpartition(-scores[active], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._id_at[slot], float(scores[slot])) for slot in top]
+
+    def search_resume(self, resume_json, k=20, exclude_ids=(), within_ids=None):
+        return self.search_text(resume_text(resume_json), k=k, exclude_ids=exclude_ids, within_ids=within_ids)
+
+    def get_jobs(self, job_ids):
+        if not job_ids:
+            return []
+        with self._connect() as conn:
+            placeholders = ",".join("?" for _ in job_ids)
+            docs = dict(conn.execute(f"SELECT job_id, doc FROM jobs WHERE job_id IN ({placeholders})", list(job_ids)).fetchall())
+        return [json.loads(docs[j]) for j in job_ids if j in docs]
+
+    def job_ids(self):
+        with self._lock:
+            self._refresh()
+            return set(self._slot_of)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_job_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = JobIndex()
+    return _index
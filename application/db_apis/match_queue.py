@@ -0,0 +1,300 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from db_apis.fetch_jobs import process_jobs_in_batches
+from utils import config as Config
+
+
+# -----------------------------
+# SQLite-backed queue for /match-jobs-db/ runs
+# -----------------------------
+# The resume JSON is only kept while a run is queued or running; it is blanked
+# when the run finishes, and finished rows are deleted after
+# MATCH_QUEUE_RETENTION_HOURS.
+#
+# Several app processes can share the database. A running run belongs to the
+# process in worker_id, which heartbeats all its runs; only runs whose
+# heartbeat is older than MATCH_LEASE_SECONDS go back to the queue.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS match_jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    resume_json TEXT NOT NULL,
+    batch_size INTEGER NOT NULL,
+    mode TEXT NOT NULL DEFAULT 'compact',
+    status TEXT NOT NULL,               -- queued | running | done | failed | cancelled
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    total_pages INTEGER,
+    jobs_scored INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    batches INTEGER NOT NULL DEFAULT 0,
+    fill_ratio_total REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    worker_id TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+# Columns added after the first release, created on older databases by init_db
+_MIGRATIONS = {
+    "mode": "TEXT NOT NULL DEFAULT 'compact'",
+    "batches": "INTEGER NOT NULL DEFAULT 0",
+    "fill_ratio_total": "REAL NOT NULL DEFAULT 0",
+    "worker_id": "TEXT",
+    "heartbeat_at": "REAL",
+}
+
+_FINISHED = ("done", "failed", "cancelled")
+_PURGE_INTERVAL = 600  # seconds between purges by an idle worker
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_workers = []
+_last_purge = [0.0]
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(Config.MATCH_QUEUE_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def init_db():
+    os.makedirs(os.path.dirname(Config.MATCH_QUEUE_DB) or ".", exist_ok=True)
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(match_jobs)")}
+        for column, definition in _MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(f"ALTER TABLE match_jobs ADD COLUMN {column} {definition}")
+    requeue_expired()
+    purge_finished()
+
+
+def requeue_expired(lease_seconds=Config.MATCH_LEASE_SECONDS):
+    """
+    Put running runs whose process stopped heartbeating (crash, restart) back
+    in the queue. Returns the number requeued.
+    """
+    with _connect() as conn:
+        requeued = conn.execute(
+            "UPDATE match_jobs SET status = 'queued', worker_id = NULL, heartbeat_at = NULL "
+            "WHERE status = 'running' AND COALESCE(heartbeat_at, 0) < ?",
+            (time.time() - lease_seconds,),
+        ).rowcount
+    if requeued:
+        print(f"♻️ Requeued {requeued} match jobs with expired leases")
+    return requeued
+
+
+def _heartbeat():
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE match_jobs SET heartbeat_at = ? WHERE worker_id = ? AND status = 'running'",
+            (time.time(), _WORKER_ID),
+        )
+
+
+def _heartbeat_loop():
+    # renews this process's leases and takes back runs from processes that died
+    while not _stop.wait(Config.MATCH_LEASE_SECONDS / 4):
+        try:
+            _heartbeat()
+            requeue_expired()
+        except sqlite3.Error as e:
+            print("❌ Match queue heartbeat failed:", str(e))
+
+
+def purge_finished(max_age_hours=Config.MATCH_QUEUE_RETENTION_HOURS):
+    """
+    Delete finished runs older than `max_age_hours`, and blank the resume of
+    any finished run still holding one. Returns the number of rows deleted.
+    """
+    _last_purge[0] = time.time()
+    placeholders = ",".join("?" for _ in _FINISHED)
+    with _connect() as conn:
+        deleted = conn.execute(
+            f"DELETE FROM match_jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+            (*_FINISHED, time.time() - max_age_hours * 3600),
+        ).rowcount
+        conn.execute(f"UPDATE match_jobs SET resume_json = '{{}}' WHERE status IN ({placeholders}) AND resume_json != '{{}}'", _FINISHED)
+    if deleted:
+        print(f"🧹 Purged {deleted} finished match jobs")
+    return deleted
+
+
+def enqueue(user_id, resume_json, batch_size=Config.MATCH_MAX_BATCH_JOBS, mode=Config.DB_MATCH_MODE):
+    job_id = uuid.uuid4().hex
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO match_jobs (id, user_id, resume_json, batch_size, mode, status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+            (job_id, user_id, json.dumps(resume_json), batch_size, mode, time.time()),
+        )
+    _wakeup.set()
+    return job_id
+
+
+def cancel(job_id):
+    """
+    Queued runs are cancelled at once; running ones stop at the next batch boundary.
+    """
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE match_jobs SET cancel_requested = 1, "
+            "status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END, "
+            "finished_at = CASE WHEN status = 'queued' THEN ? ELSE finished_at END, "
+            "resume_json = CASE WHEN status = 'queued' THEN '{}' ELSE resume_json END "
+            "WHERE id = ?",
+            (time.time(), job_id),
+        )
+    return get_status(job_id)
+
+
+def get_status(job_id):
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM match_jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+
+    eta_seconds = None
+    if row["status"] == "running" and row["pages_done"] and row["total_pages"]:
+        elapsed = time.time() - row["started_at"]
+        remaining_pages = max(row["total_pages"] - row["pages_done"], 0)
+        eta_seconds = round(elapsed / row["pages_done"] * remaining_pages, 1)
+
+    return {
+        "job_id": row["id"],
+        "user_id": row["user_id"],
+        "status": row["status"],
+        "mode": row["mode"],
+        "cancel_requested": bool(row["cancel_requested"]),
+        "pages_done": row["pages_done"],
+        "total_pages": row["total_pages"],
+        "jobs_scored": row["jobs_scored"],
+        "errors": row["errors"],
+        "batches": row["batches"],
+        "avg_batch_fill": round(row["fill_ratio_total"] / row["batches"], 3) if row["batches"] else None,
+        "last_error": row["last_error"],
+        "worker_id": row["worker_id"],
+        "eta_seconds": eta_seconds,
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+
+
+def _claim_next():
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT * FROM match_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            now = time.time()
+            conn.execute(
+                "UPDATE match_jobs SET status = 'running', started_at = ?, worker_id = ?, heartbeat_at = ? WHERE id = ?",
+                (now, _WORKER_ID, now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    return row
+
+
+def _finish(job_id, status, error=None):
+    # a run requeued after this process lost its lease belongs to someone else now
+    with _connect() as conn:
+        finished = conn.execute(
+            "UPDATE match_jobs SET status = ?, finished_at = ?, last_error = COALESCE(?, last_error), resume_json = '{}' "
+            "WHERE id = ? AND worker_id = ?",
+            (status, time.time(), error, job_id, _WORKER_ID),
+        ).rowcount
+    if not finished:
+        print(f"⚠️ Match job {job_id} lost its lease; result not recorded")
+
+
+class MatchProgress:
+    """
+    Progress sink handed to process_jobs_in_batches; every update is written
+    straight to the queue table so the status endpoint sees it.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def _update(self, sql, params=()):
+        with _connect() as conn:
+            conn.execute(sql, (*params, self.job_id))
+
+    def page_done(self, page, total_pages):
+        # Pages can finish out of order in the pipelined matcher, so count rather than copy `page`
+        self._update("UPDATE match_jobs SET pages_done = pages_done + 1, total_pages = ? WHERE id = ?", (total_pages,))
+
+    def batch_packed(self, fill_ratio):
+        self._update("UPDATE match_jobs SET batches = batches + 1, fill_ratio_total = fill_ratio_total + ? WHERE id = ?", (fill_ratio,))
+
+    def job_scored(self, count=1):
+        self._update("UPDATE match_jobs SET jobs_scored = jobs_scored + ? WHERE id = ?", (count,))
+
+    def error(self, message):
+        self._update("UPDATE match_jobs SET errors = errors + 1, last_error = ? WHERE id = ?", (message,))
+
+    def cancelled(self):
+        # also stops a run this process no longer holds the lease for
+        with _connect() as conn:
+            row = conn.execute("SELECT cancel_requested, worker_id FROM match_jobs WHERE id = ?", (self.job_id,)).fetchone()
+        return bool(row is None or row["cancel_requested"] or row["worker_id"] != _WORKER_ID)
+
+
+def _worker_loop():
+    while not _stop.is_set():
+        row = _claim_next()
+        if row is None:
+            if time.time() - _last_purge[0] >= _PURGE_INTERVAL:
+                purge_finished()
+            _wakeup.wait(timeout=1)
+            _wakeup.clear()
+            continue
+
+        job_id = row["id"]
+        progress = MatchProgress(job_id)
+        print(f"🚀 Match job {job_id} started for user {row['user_id']}")
+
+        try:
+            process_jobs_in_batches(row["user_id"], json.loads(row["resume_json"]), batch_size=row["batch_size"], progress=progress, mode=row["mode"])
+        except Exception as e:
+            print(f"❌ Match job {job_id} failed:", str(e))
+            _finish(job_id, "failed", str(e))
+            continue
+
+        _finish(job_id, "cancelled" if progress.cancelled() else "done")
+        print(f"🎯 Match job {job_id} finished")
+
+
+def start_workers(count=Config.MATCH_WORKERS):
+    init_db()
+    _stop.clear()
+    threads = [threading.Thread(target=_heartbeat_loop, name="match-heartbeat", daemon=True)]
+    threads += [threading.Thread(target=_worker_loop, name=f"match-worker-{n}", daemon=True) for n in range(count)]
+    for thread in threads:
+        thread.start()
+        _workers.append(thread)
+
+
+def stop_workers():
+    _stop.set()
+    _wakeup.set()
+    _workers.clear()
@@ -0,0 +1,139 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from utils import config as Config
+
+
+# -----------------------------
+# Shared HTTP session for the vehire jobs API
+# -----------------------------
+_session = None
+_session_lock = threading.Lock()
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def get_session():
+    """
+    One keep-alive connection pool per process for every call to the jobs API.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.SCORE_WRITE_CONCURRENCY * 2)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Content-Type": "application/json"})
+                _session = session
+    return _session
+
+
+class ScoreWriter:
+    """
+    Writes match scores back to the jobs API for one user/run.
+
+    Updates go out on a small thread pool (at most `concurrency` in flight)
+    over the shared session. Transient failures (connection errors,
+    timeouts, 408/429/5xx) are retried with jittered exponential backoff.
+    When SCORE_BULK_URL is set, scores are buffered and sent `bulk_size`
+    at a time to that endpoint instead of one PUT per job.
+    Scores that did not come from the LLM matcher are sent with a
+    `scoreSource` (e.g. "local") so the backend can tell them apart.
+    Call close() to wait for everything and get the run's counts.
+    """
+
+    def __init__(self, user_id, concurrency=Config.SCORE_WRITE_CONCURRENCY, max_retries=Config.SCORE_WRITE_RETRIES,
+                 backoff=Config.SCORE_WRITE_BACKOFF, timeout=Config.SCORE_WRITE_TIMEOUT,
+                 bulk_url=Config.SCORE_BULK_URL, bulk_size=Config.SCORE_BULK_SIZE, on_result=None):
+        self.user_id = user_id
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bulk_url = bulk_url
+        self.bulk_size = bulk_size
+        self.on_result = on_result  # called as on_result(job_ids, ok, error_message)
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="score-write")
+        self._futures = []
+        self._buffer = []
+        self._lock = threading.Lock()
+        self.counts = {"succeeded": 0, "failed": 0, "retries": 0}
+
+    def submit(self, job_id, match_score, job_title="N/A", source=None):
+        item = {"user": self.user_id, "jobId": job_id, "jobScore": match_score}
+        if source:
+            item["scoreSource"] = source
+
+        if self.bulk_url:
+            with self._lock:
+                self._buffer.append(item)
+                if len(self._buffer) < self.bulk_size:
+                    return
+                items, self._buffer = self._buffer, []
+            self._futures.append(self._executor.submit(self._send_bulk, items))
+            return
+
+        self._futures.append(self._executor.submit(self._send_one, item, job_title))
+
+    def close(self):
+        if self.bulk_url:
+            with self._lock:
+                items, self._buffer = self._buffer, []
+            if items:
+                self._futures.append(self._executor.submit(self._send_bulk, items))
+
+        for future in list(self._futures):
+            future.result()
+        self._executor.shutdown(wait=True)
+
+        print(f"📝 Score write-back: {self.counts['succeeded']} ok, {self.counts['failed']} failed, {self.counts['retries']} retries")
+        return dict(self.counts)
+
+    # ---- sending ----
+    def _send_one(self, item, job_title):
+        ok, status, error = self._request("PUT", Config.SCORE_UPDATE_URL, item)
+        print(f"→ Updated {job_title} ({item['jobId']}) → {status}")
+        self._record([item["jobId"]], ok, error)
+
+    def _send_bulk(self, items):
+        ok, status, error = self._request("POST", self.bulk_url, {"scores": items})
+        print(f"→ Bulk updated {len(items)} scores → {status}")
+        self._record([item["jobId"] for item in items], ok, error)
+
+    def _request(self, method, url, payload):
+        body = json.dumps(payload)
+        error = None
+        status = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self.counts["retries"] += 1
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+            try:
+                r = get_session().request(method, url, data=body, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                status, error = None, str(e)
+                continue
+
+            status = r.status_code
+            if r.ok:
+                return True, status, None
+            error = f"HTTP {status}: {r.text[:200]}"
+            if status not in RETRYABLE_STATUS:
+                break
+
+        return False, status, error
+
+    def _record(self, job_ids, ok, error):
+        with self._lock:
+            self.counts["succeeded" if ok else "failed"] += len(job_ids)
+        if self.on_result:
+            self.on_result(job_ids, ok, error)
@@ -1,7 +1,6 @@
 import os
-from utils.utils_functions import is_pdf_text_based,save_text_to_file
-from ocr_module.pymupdf_txt import extract_text_from_pdf
-from ocr_module.pytesseract_txt import get_text_pytesseract
+import fitz  # PyMuPDF
+from ocr_module.hybrid_txt import extract_text_hybrid
 
 
 results_dir = "results"
@@ -12,16 +11,9 @@ def get_resume_text(pdf_path):
 
     file_name = os.path.splitext(os.path.basename(pdf_path))[0]
 
-    result = is_pdf_text_based(pdf_path)
-
-    if result:
-        print("Pdf contains digital text (at least 20 words)")
-        pdf_text = extract_text_from_pdf(pdf_path)
-
-    else:
-        print("PDF likely contains scanned images or very little text.")
-
-        pdf_text = get_text_pytesseract(pdf_path)
+    # Text layer where present, OCR only for image-only pages
+    with fitz.open(pdf_path) as doc:
+        pdf_text = extract_text_hybrid(doc)
 
     
     # file_path = f"{results_dir}/cvs_txt/{file_name}.txt"
@@ -30,8 +22,18 @@ def get_resume_text(pdf_path):
     os.remove(pdf_path)
     
     return pdf_text
-    
 
 
 
 
+def get_resume_text_from_bytes(pdf_bytes: bytes):
+    """
+    In-memory variant of get_resume_text: the upload is opened once with
+    fitz and the same document handle is used for per-page detection and
+    extraction. Nothing is written to disk, so concurrent uploads never collide.
+    """
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        pdf_text = extract_text_hybrid(doc)
+
+    return pdf_text
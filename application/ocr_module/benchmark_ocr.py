@@ -0,0 +1,53 @@
+"""
+Per-page OCR latency: pytesseract (new tesseract process per page) vs the
+persistent tesserocr workers in ocr_module.tesseract_workers.
+
+    cd application
+    python -m ocr_module.benchmark_ocr path/to/scanned.pdf [rounds]
+"""
+import sys
+import time
+import fitz  # PyMuPDF
+from ocr_module.ocr_scheduler import _ocr_image
+from ocr_module.pytesseract_txt import render_page_image
+from ocr_module import tesseract_workers
+from utils import config as Config
+
+
+def _per_page_ms(fn, images, rounds):
+    # one untimed pass so both sides start warm (page cache, worker spawn + engine load)
+    for img in images:
+        fn(img)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for img in images:
+            fn(img)
+    return 1000 * (time.perf_counter() - start) / (rounds * len(images))
+
+
+def main(pdf_path, rounds=3):
+    with fitz.open(pdf_path) as doc:
+        images = [render_page_image(page, dpi=Config.OCR_DPI) for page in doc]
+
+    print(f"📄 {pdf_path}: {len(images)} pages @ {Config.OCR_DPI} dpi, {rounds} rounds")
+
+    subprocess_ms = _per_page_ms(_ocr_image, images, rounds)
+    print(f"pytesseract (process per page): {subprocess_ms:.1f} ms/page")
+
+    if not tesseract_workers.available():
+        print("tesserocr is not installed; persistent worker backend skipped")
+        return
+
+    persistent_ms = _per_page_ms(lambda img: tesseract_workers.submit(img).result(), images, rounds)
+    tesseract_workers.shutdown()
+
+    print(f"tesserocr (persistent worker):  {persistent_ms:.1f} ms/page")
+    print(f"saving: {subprocess_ms - persistent_ms:.1f} ms/page ({100 * (1 - persistent_ms / subprocess_ms):.0f}%)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,73 @@
+import fitz  # PyMuPDF
+import numpy as np
+from ocr_module.pytesseract_txt import render_page_image
+from ocr_module.ocr_scheduler import ocr_images_in_order
+from utils import config as Config
+
+
+def covered_fraction(rects, page_rect, grid=64):
+    """
+    Share of the page covered by the union of `rects` (x0, y0, x1, y1),
+    measured on a grid x grid mask so overlapping rects count once.
+    """
+    mask = np.zeros((grid, grid), dtype=bool)
+    width, height = page_rect.width, page_rect.height
+    if width <= 0 or height <= 0:
+        return 0.0
+    for x0, y0, x1, y1 in rects:
+        c0, c1 = (int(np.clip((x - page_rect.x0) / width * grid, 0, grid) + 0.5) for x in (x0, x1))
+        r0, r1 = (int(np.clip((y - page_rect.y0) / height * grid, 0, grid) + 0.5) for y in (y0, y1))
+        mask[r0:r1, c0:c1] = True
+    return float(mask.mean())
+
+
+def page_needs_ocr(page, text, min_words=Config.OCR_MIN_PAGE_WORDS,
+                   min_image_coverage=Config.OCR_MIN_IMAGE_COVERAGE, max_text_coverage=Config.OCR_MAX_TEXT_COVERAGE):
+    """
+    A page is OCR'd when it carries an image and either its text layer is
+    (almost) empty, or images cover most of the page while the text layer
+    covers little of it: a scanned sheet with a typed header or footer.
+    A digital page on a full-page background image keeps its text layer.
+    Blank pages are skipped.
+    """
+    if not page.get_images(full=False):
+        return False
+    if len(text.split()) < min_words:
+        return True
+
+    image_rects = [info["bbox"] for info in page.get_image_info()]
+    if covered_fraction(image_rects, page.rect) < min_image_coverage:
+        return False
+    text_rects = [block[:4] for block in page.get_text("blocks") if block[6] == 0 and block[4].strip()]
+    return covered_fraction(text_rects, page.rect) < max_text_coverage
+
+
+def extract_text_hybrid(doc, min_words=Config.OCR_MIN_PAGE_WORDS, dpi=Config.OCR_DPI) -> str:
+    """
+    Per-page text extraction for an open fitz.Document: pages with a usable
+    text layer are read with PyMuPDF, scanned pages (page_needs_ocr) are rasterized and
+    OCR'd through the shared OCR scheduler, and the pieces are joined back in
+    page order.
+
+    A fully digital PDF gives the same output as extract_text_from_pdf and a
+    fully scanned one the same as get_text_pytesseract.
+    """
+    parts = []
+    ocr_pages = []
+
+    for i, page in enumerate(doc):
+        text = page.get_text()
+        if page_needs_ocr(page, text, min_words):
+            parts.append(None)  # filled in after OCR
+            ocr_pages.append(i)
+        else:
+            parts.append(text)
+
+    if ocr_pages:
+        images = (render_page_image(doc[i], dpi=dpi) for i in ocr_pages)
+        for i, text in zip(ocr_pages, ocr_images_in_order(images)):
+            parts[i] = f"\n\n--- Page {i + 1} ---\n{text}"
+
+    print(f"Extracted {len(parts)} pages ({len(ocr_pages)} via OCR)")
+
+    return "".join(parts)
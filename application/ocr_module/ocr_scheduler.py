@@ -0,0 +1,255 @@
+import asyncio
+import contextvars
+import functools
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import pytesseract
+from utils import config as Config
+
+
+class OCRQueueFull(Exception):
+    """Raised when a new document arrives while the OCR page queue is at OCR_MAX_QUEUE_DEPTH."""
+
+
+_wait_when_full = contextvars.ContextVar("ocr_wait_when_full", default=False)
+
+# Threads that may block waiting for room in a full OCR queue. Kept apart from
+# utils.thread_pool so a burst of batch uploads can't take every shared worker.
+_waiting_executor = ThreadPoolExecutor(max_workers=Config.BATCH_EXTRACT_CONCURRENCY, thread_name_prefix="ocr-wait")
+
+
+async def run_waiting_for_ocr(func, *args, **kwargs):
+    """
+    Like utils.thread_pool.run_in_pool, on the OCR wait pool: documents opened
+    by `func` wait for room in a full OCR queue instead of raising
+    OCRQueueFull. For batch work, where a 503 would just fail the item.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    context.run(_wait_when_full.set, True)
+    return await loop.run_in_executor(_waiting_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+# -----------------------------
+# Shared OCR process pool
+# -----------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_ocr_worker():
+    # One Tesseract thread per process; parallelism comes from the pool
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def get_ocr_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=Config.OCR_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_ocr_worker,
+                )
+    return _pool
+
+
+def _ocr_image(img):
+    try:
+        return pytesseract.image_to_string(img, lang=Config.OCR_LANG, config="--psm 6")
+    except (pytesseract.TesseractError, pytesseract.TesseractNotFoundError) as e:
+        # pytesseract's exceptions don't survive pickling and would break the pool
+        raise RuntimeError(f"OCR failed: {e}") from None
+
+
+def submit_to_process_pool(img):
+    return get_ocr_pool().submit(_ocr_image, img)
+
+
+# -----------------------------
+# Process-wide page scheduler
+# -----------------------------
+class OCRScheduler:
+    """
+    Page-level OCR queue shared by every request in the process.
+
+    Each document gets its own FIFO of pages; a single dispatcher thread hands
+    pages to the backend round-robin across documents, never keeping more than
+    `workers` pages in flight. A 30-page scan therefore interleaves with a
+    1-page CV instead of running ahead of it. New documents are refused with
+    OCRQueueFull once `max_queue_depth` pages are already waiting, or with
+    `wait=True` block until the queue drains below it.
+    """
+
+    def __init__(self, submit_fn, workers, max_queue_depth, wait_samples=1000):
+        self.submit_fn = submit_fn
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # doc_id -> deque of (img, future, enqueued_at)
+        self._queued = 0
+        self._inflight = 0
+        self._doc_ids = itertools.count(1)
+        self._waits = deque(maxlen=wait_samples)
+        self._pages_done = 0
+        self._rejected = 0
+        self._thread = None
+
+    # ---- document lifecycle ----
+    def open_document(self, wait=False):
+        with self._cond:
+            if wait:
+                self._cond.wait_for(lambda: self._queued < self.max_queue_depth)
+            elif self._queued >= self.max_queue_depth:
+                self._rejected += 1
+                raise OCRQueueFull(f"OCR queue is full ({self._queued} pages waiting)")
+            doc_id = next(self._doc_ids)
+            self._queues[doc_id] = deque()
+            self._ensure_dispatcher()
+            return doc_id
+
+    def close_document(self, doc_id):
+        with self._cond:
+            pages = self._queues.pop(doc_id, None) or ()
+            for _, future, _ in pages:
+                future.cancel()
+            self._queued -= len(pages)
+            self._cond.notify_all()
+
+    def submit_page(self, doc_id, img) -> Future:
+        future = Future()
+        with self._cond:
+            self._queues[doc_id].append((img, future, time.perf_counter()))
+            self._queued += 1
+            self._cond.notify_all()
+        return future
+
+    # ---- dispatching ----
+    def _ensure_dispatcher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch_loop, name="ocr-scheduler", daemon=True)
+            self._thread.start()
+
+    def _next_page(self):
+        # Round-robin: take the head page of the first non-empty document, then rotate it to the back
+        for doc_id, pages in self._queues.items():
+            if pages:
+                self._queues.move_to_end(doc_id)
+                self._queued -= 1
+                return pages.popleft()
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while self._inflight >= self.workers or self._queued == 0:
+                    self._cond.wait()
+                img, future, enqueued_at = self._next_page()
+                self._inflight += 1
+                self._waits.append(time.perf_counter() - enqueued_at)
+
+            if not future.set_running_or_notify_cancel():
+                self._page_finished(done=False)
+                continue
+
+            try:
+                backend_future = self.submit_fn(img)
+            except Exception as e:
+                future.set_exception(e)
+                self._page_finished()
+                continue
+
+            backend_future.add_done_callback(lambda f, target=future: self._on_done(f, target))
+
+    def _on_done(self, backend_future, future):
+        try:
+            future.set_result(backend_future.result())
+        except Exception as e:
+            future.set_exception(e)
+        self._page_finished()
+
+    def _page_finished(self, done=True):
+        with self._cond:
+            self._inflight -= 1
+            self._pages_done += done
+            self._cond.notify_all()
+
+    # ---- metrics ----
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "queue_depth": self._queued,
+                "max_queue_depth": self.max_queue_depth,
+                "inflight_pages": self._inflight,
+                "workers": self.workers,
+                "active_documents": len(self._queues),
+                "pages_done": self._pages_done,
+                "rejected_documents": self._rejected,
+                "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                "wait_ms_max": round(1000 * waits[-1], 2) if waits else 0.0,
+            }
+
+
+def _backend_submit_fn():
+    """
+    Persistent tesserocr workers when the binding is installed (OCR_BACKEND=auto|tesserocr),
+    otherwise the pytesseract process pool, which starts the tesseract binary per page.
+    """
+    if Config.OCR_BACKEND != "pytesseract":
+        from ocr_module import tesseract_workers
+        if tesseract_workers.available():
+            return tesseract_workers.submit
+        if Config.OCR_BACKEND == "tesserocr":
+            print("❌ OCR_BACKEND=tesserocr but tesserocr is not installed; using pytesseract")
+    return submit_to_process_pool
+
+
+scheduler = OCRScheduler(
+    _backend_submit_fn(),
+    workers=Config.OCR_WORKERS,
+    max_queue_depth=Config.OCR_MAX_QUEUE_DEPTH,
+)
+
+
+def ocr_images_in_order(images, max_inflight=None):
+    """
+    OCR a (lazy) iterable of page images through the shared scheduler and
+    yield the texts in the same order. At most `max_inflight` images of this
+    document are rendered and queued at once, so memory stays flat however
+    long the document is.
+    """
+    max_inflight = max_inflight or Config.OCR_MAX_INFLIGHT_PAGES
+    doc_id = scheduler.open_document(wait=_wait_when_full.get())
+    pending = deque()
+
+    try:
+        for img in images:
+            pending.append(scheduler.submit_page(doc_id, img))
+            if len(pending) >= max_inflight:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        scheduler.close_document(doc_id)
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    _waiting_executor.shutdown(wait=False, cancel_futures=True)
+
+    from ocr_module import tesseract_workers
+    tesseract_workers.shutdown()
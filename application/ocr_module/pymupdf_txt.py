@@ -4,16 +4,20 @@ from pathlib import Path
 def extract_text_from_pdf(pdf_path: Path) -> None:
     """
     Extracts text from a PDF using PyMuPDF and saves it as a .txt file in the same directory.
+    `pdf_path` may also be an already opened fitz.Document, which is read in place.
     """
 
-    pdf_path = Path(pdf_path)
+    if isinstance(pdf_path, fitz.Document):
+        full_text = "".join(page.get_text() for page in pdf_path)
+    else:
+        pdf_path = Path(pdf_path)
 
-    # output_txt_path = pdf_path.with_suffix(".txt")
+        # output_txt_path = pdf_path.with_suffix(".txt")
 
-    with fitz.open(pdf_path) as doc:
-        full_text = ""
-        for page in doc:
-            full_text += page.get_text()
+        with fitz.open(pdf_path) as doc:
+            full_text = ""
+            for page in doc:
+                full_text += page.get_text()
 
     # with open(output_txt_path, "w", encoding="utf-8") as f:
     #     f.write(full_text)
@@ -1,23 +1,49 @@
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
+import fitz  # PyMuPDF
+from PIL import Image
 from pathlib import Path
-import os
+from ocr_module.ocr_scheduler import ocr_images_in_order
+from utils import config as Config
 
-def get_text_pytesseract(pdf_path: str) -> None:
+
+def get_text_pytesseract(pdf_path: str, dpi: int = Config.OCR_DPI, streaming: bool = Config.OCR_STREAMING) -> None:
 
     pdf_path = Path(pdf_path)
 
     output_txt_path = pdf_path.with_suffix(".txt")
 
-    images = convert_from_path(pdf_path)
     full_text = ""
 
+    if streaming:
+        # Render one page at a time instead of holding the whole document as images
+        page_count = pdfinfo_from_path(pdf_path)["Pages"]
+        images = (
+            convert_from_path(pdf_path, dpi=dpi, first_page=n, last_page=n)[0]
+            for n in range(1, page_count + 1)
+        )
+        for i, text in enumerate(ocr_images_in_order(images)):
+            full_text += f"\n\n--- Page {i+1} ---\n{text}"
+
+        return full_text
+
+    images = convert_from_path(pdf_path, dpi=dpi)
+
     for i, img in enumerate(images):
-        text = pytesseract.image_to_string(img, config="--psm 6")
+        text = pytesseract.image_to_string(img, lang=Config.OCR_LANG, config="--psm 6")
         full_text += f"\n\n--- Page {i+1} ---\n{text}"
 
     # with open(output_txt_path, "w", encoding="utf-8") as f:
     #     f.write(full_text)
 
-    
+
     return full_text
+
+
+
+def render_page_image(page, dpi=Config.OCR_DPI):
+    """
+    Rasterize one fitz page into a PIL image at the configured OCR DPI.
+    """
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
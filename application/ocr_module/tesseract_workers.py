@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+from utils import config as Config
+
+try:
+    import tesserocr
+except ImportError:  # optional: needs libtesseract headers at install time
+    tesserocr = None
+
+
+# -----------------------------
+# Worker side: one engine per process, loaded once
+# -----------------------------
+_api = None
+
+
+def _init_worker(lang, psm):
+    global _api
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+
+
+def _ocr_shared_image(shm_name, size, mode, nbytes):
+    """
+    OCR a page whose raw pixels sit in a shared memory block written by the parent.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        img = Image.frombytes(mode, size, bytes(shm.buf[:nbytes]))
+    finally:
+        shm.close()
+
+    try:
+        _api.SetImage(img)
+        text = _api.GetUTF8Text()
+    except RuntimeError as e:
+        raise RuntimeError(f"OCR failed: {e}") from None
+    finally:
+        _api.Clear()
+
+    # The tesseract CLI (and so pytesseract) ends each page with a form feed
+    return text + "\f"
+
+
+# -----------------------------
+# Parent side
+# -----------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def available():
+    return tesserocr is not None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=Config.OCR_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(Config.OCR_LANG, tesserocr.PSM.SINGLE_BLOCK),  # same as --psm 6
+                )
+    return _pool
+
+
+def submit(img):
+    """
+    Hand one PIL page image to a persistent Tesseract worker. Pixels travel
+    through shared memory instead of temp files or a pickled copy, in RGB like
+    the image pytesseract gets, so both backends OCR the same input.
+    Returns a concurrent.futures.Future.
+    """
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    data = img.tobytes()
+
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+
+    def _release(_):
+        shm.close()
+        shm.unlink()
+
+    try:
+        future = get_pool().submit(_ocr_shared_image, shm.name, img.size, img.mode, len(data))
+    except BaseException:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
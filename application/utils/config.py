@@ -25,4 +25,134 @@ projects_weightage=25
 qualification_weightage=20
 
 
-MAX_JOBS = 5
\ No newline at end of file
+MAX_JOBS = 5
+
+# OpenAI connection pool (shared by every ai_agents call)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))  # SDK-level retries; ai_agents/llm_resilience.py retries instead
+OPENAI_WARM_ON_STARTUP = os.getenv("OPENAI_WARM_ON_STARTUP", "true").lower() == "true"
+
+# Bounded thread pool for sync work called from async handlers (OCR, requests, DB matching)
+SYNC_POOL_WORKERS = int(os.getenv("SYNC_POOL_WORKERS", "16"))
+
+# Parsed-resume cache (keyed by PDF SHA-256 + model + prompt/schema hash)
+RESUME_CACHE_DIR = os.getenv("RESUME_CACHE_DIR", "results/resume_cache")
+RESUME_CACHE_MEMORY_ITEMS = int(os.getenv("RESUME_CACHE_MEMORY_ITEMS", "512"))
+RESUME_CACHE_MAX_DISK_BYTES = int(os.getenv("RESUME_CACHE_MAX_DISK_BYTES", str(256 * 1024 * 1024)))
+
+# OCR
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_MIN_PAGE_WORDS = int(os.getenv("OCR_MIN_PAGE_WORDS", "10"))  # below this a page with images is OCR'd
+OCR_MIN_IMAGE_COVERAGE = float(os.getenv("OCR_MIN_IMAGE_COVERAGE", "0.5"))  # share of the page under images that marks it as a scan...
+OCR_MAX_TEXT_COVERAGE = float(os.getenv("OCR_MAX_TEXT_COVERAGE", "0.2"))  # ...when its text layer covers less than this share (a typed header/footer)
+OCR_STREAMING = os.getenv("OCR_STREAMING", "true").lower() == "true"  # render + OCR page by page in a process pool
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_MAX_INFLIGHT_PAGES = int(os.getenv("OCR_MAX_INFLIGHT_PAGES", str(OCR_WORKERS * 2)))  # caps rendered pages held in memory
+OCR_MAX_QUEUE_DEPTH = int(os.getenv("OCR_MAX_QUEUE_DEPTH", "200"))  # waiting pages before new documents get 503
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto")  # auto | tesserocr (persistent engine per worker) | pytesseract
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+# Batch resume ingestion
+BATCH_EXTRACT_CONCURRENCY = int(os.getenv("BATCH_EXTRACT_CONCURRENCY", str(OCR_WORKERS)))  # per request, and threads in the OCR wait pool
+BATCH_PARSE_CONCURRENCY = int(os.getenv("BATCH_PARSE_CONCURRENCY", "8"))
+BATCH_MAX_ZIP_MB = float(os.getenv("BATCH_MAX_ZIP_MB", "100"))  # uploaded zip size
+BATCH_MAX_ZIP_PDFS = int(os.getenv("BATCH_MAX_ZIP_PDFS", "500"))  # PDFs per zip
+BATCH_MAX_UNZIPPED_MB = float(os.getenv("BATCH_MAX_UNZIPPED_MB", "500"))  # decompressed size of the PDFs in one zip
+
+# Background /match-jobs-db/ queue
+MATCH_QUEUE_DB = os.getenv("MATCH_QUEUE_DB", "results/match_jobs.sqlite3")
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+MATCH_QUEUE_RETENTION_HOURS = float(os.getenv("MATCH_QUEUE_RETENTION_HOURS", "72"))  # finished runs are deleted after this
+MATCH_LEASE_SECONDS = float(os.getenv("MATCH_LEASE_SECONDS", "120"))  # a running run whose process stops heartbeating this long is requeued
+MATCH_LLM_CONCURRENCY = int(os.getenv("MATCH_LLM_CONCURRENCY", "4"))  # LLM batches in parallel per run; can be raised (e.g. 16) and left to the limiter's AIMD controller
+
+# vehire jobs API
+VEHIRE_API_BASE = os.getenv("VEHIRE_API_BASE", "https://www.vehire.ai/api/job-applying")
+JOBS_LIST_URL = f"{VEHIRE_API_BASE}/jobpost/getAllPublic"
+SCORE_UPDATE_URL = f"{VEHIRE_API_BASE}/jobpost/updateScore"
+SCORE_BULK_URL = os.getenv("SCORE_BULK_URL") or None  # set once the backend offers a bulk score endpoint
+SCORE_BULK_SIZE = int(os.getenv("SCORE_BULK_SIZE", "50"))
+SCORE_WRITE_CONCURRENCY = int(os.getenv("SCORE_WRITE_CONCURRENCY", "8"))
+SCORE_WRITE_RETRIES = int(os.getenv("SCORE_WRITE_RETRIES", "3"))
+SCORE_WRITE_BACKOFF = float(os.getenv("SCORE_WRITE_BACKOFF", "0.5"))
+SCORE_WRITE_TIMEOUT = float(os.getenv("SCORE_WRITE_TIMEOUT", "10"))
+DB_MATCH_MODE = os.getenv("DB_MATCH_MODE", "compact")  # compact (scores only) | detailed
+
+# Local pre-ranking before LLM matching (0 disables): only the best N jobs go to
+# the LLM, the rest get their local score. Every page is fetched before scoring starts
+PRERANK_TOP_N = int(os.getenv("PRERANK_TOP_N", "50"))
+PRERANK_MIN_SCORE = float(os.getenv("PRERANK_MIN_SCORE", "0"))
+MATCH_RETRIEVE_TOP_K = int(os.getenv("MATCH_RETRIEVE_TOP_K", "200"))  # job index candidates the pre-rank picks from (0 pre-ranks every job)
+
+# Local job posting index (hashed TF-IDF, memory-mapped)
+JOB_INDEX_DIR = os.getenv("JOB_INDEX_DIR", "results/job_index")
+JOB_INDEX_DIM = int(os.getenv("JOB_INDEX_DIM", "4096"))
+
+# Token budgeting (tiktoken when installed, else len/TOKEN_ESTIMATE_CHARS)
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+TOKEN_ESTIMATE_CHARS = float(os.getenv("TOKEN_ESTIMATE_CHARS", "4"))
+
+# Job matcher batches are packed by tokens: prompt + expected output must fit
+# MATCH_TOKEN_BUDGET (0 falls back to fixed batches of MATCH_MAX_BATCH_JOBS)
+MATCH_TOKEN_BUDGET = int(os.getenv("MATCH_TOKEN_BUDGET", "12000"))
+MATCH_MAX_OUTPUT_TOKENS = int(os.getenv("MATCH_MAX_OUTPUT_TOKENS", "4000"))
+MATCH_MAX_BATCH_JOBS = int(os.getenv("MATCH_MAX_BATCH_JOBS", "25"))
+MATCH_OUTPUT_TOKENS_PER_JOB = {
+    "compact": int(os.getenv("MATCH_OUTPUT_TOKENS_COMPACT", "45")),
+    "detailed": int(os.getenv("MATCH_OUTPUT_TOKENS_DETAILED", "400")),
+}
+
+# Prompt payload compaction: log + total the tokens saved per call (GET /llm/payload-stats)
+PROMPT_COMPACTION_STATS = os.getenv("PROMPT_COMPACTION_STATS", "true").lower() == "true"
+
+# Server-sent-event streaming endpoints: seconds between `progress` events while the model writes
+SSE_PROGRESS_INTERVAL = float(os.getenv("SSE_PROGRESS_INTERVAL", "1.0"))
+
+# Process-wide LLM rate limiter (0 disables a bucket); calls outside a declared class run as LLM_DEFAULT_PRIORITY
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "200000"))
+LLM_DEFAULT_PRIORITY = os.getenv("LLM_DEFAULT_PRIORITY", "background")  # interactive | background
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1000"))  # reserved per call until usage is known
+
+# AIMD in-flight LLM call limit, driven by 429s, timeouts, Retry-After and x-ratelimit-* headers
+LLM_AIMD_INITIAL = int(os.getenv("LLM_AIMD_INITIAL", "8"))
+LLM_AIMD_MIN = int(os.getenv("LLM_AIMD_MIN", "1"))
+LLM_AIMD_MAX = int(os.getenv("LLM_AIMD_MAX", "64"))
+LLM_AIMD_DECREASE = float(os.getenv("LLM_AIMD_DECREASE", "0.5"))
+LLM_AIMD_COOLDOWN = float(os.getenv("LLM_AIMD_COOLDOWN", "2"))  # seconds between two decreases
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # e.g. a local mock server (ai_agents/benchmark_rate_limits.py)
+
+# LLM call resilience (ai_agents/llm_resilience.py): deadline, retries, hedging
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "150"))  # seconds per call, all attempts included
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "60"))  # HTTP timeout of one attempt
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))  # never hedge sooner than this, p95 or not
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # latencies needed before the p95 is trusted
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))  # at most this share of calls get a hedge
+LLM_HEDGE_THREADS = int(os.getenv("LLM_HEDGE_THREADS", "32"))
+
+# Tiered model routing (ai_agents/model_router.py): MODEL_1 -> MODEL -> MODEL_3
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_SHORT_INPUT_TOKENS = int(os.getenv("ROUTER_SHORT_INPUT_TOKENS", "2500"))  # resumes up to this size start on MODEL_1
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.7"))  # below this, an email classification escalates
+
+# Local fast path for /classify-job-status (ai_agents/email_classifier.py)
+EMAIL_CLASSIFIER_ENABLED = os.getenv("EMAIL_CLASSIFIER_ENABLED", "true").lower() == "true"
+EMAIL_CLASSIFIER_PATH = os.getenv("EMAIL_CLASSIFIER_PATH", "results/email_classifier.npz")
+EMAIL_CLASSIFIER_HISTORY = os.getenv("EMAIL_CLASSIFIER_HISTORY", "")  # opt-in: JSONL of LLM-labeled email bodies to train on (e.g. results/email_history.jsonl); "" = don't record
+EMAIL_CLASSIFIER_HISTORY_MAX_MB = float(os.getenv("EMAIL_CLASSIFIER_HISTORY_MAX_MB", "50"))  # recording stops once the history file reaches this size
+EMAIL_CLASSIFIER_DIM = int(os.getenv("EMAIL_CLASSIFIER_DIM", str(2 ** 18)))
+EMAIL_CLASSIFIER_THRESHOLD = float(os.getenv("EMAIL_CLASSIFIER_THRESHOLD", "0.9"))  # below this probability, ask the LLM
+
+# Bulk email classification (/classify-job-status/batch)
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "40"))  # emails per LLM call
+EMAIL_BATCH_TOKEN_BUDGET = int(os.getenv("EMAIL_BATCH_TOKEN_BUDGET", "8000"))  # email tokens per LLM call
+EMAIL_BATCH_CONCURRENCY = int(os.getenv("EMAIL_BATCH_CONCURRENCY", "16"))  # LLM calls in parallel per request
+EMAIL_BATCH_MAX_EMAILS = int(os.getenv("EMAIL_BATCH_MAX_EMAILS", "5000"))
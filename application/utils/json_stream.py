@@ -0,0 +1,71 @@
+import json
+
+
+class JsonSectionParser:
+    """
+    Incremental parser for a streamed top-level JSON object.
+
+    feed() takes the next chunk of model output and returns the top-level
+    members that became complete, as [(key, value)], in order. Anything
+    before the first "{" (e.g. a ```json fence) is skipped. Only string
+    state and nesting depth are tracked while scanning, so each byte is
+    looked at once; a member is json-decoded once it is closed.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        sections = []
+
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                if self._depth >= 1:
+                    self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    sections.extend(self._close_member(text, i))
+                    self.done = True
+                    self._pos = i + 1
+                    return sections
+            elif ch == "," and self._depth == 1:
+                sections.extend(self._close_member(text, i))
+                self._member_start = i + 1
+
+        self._pos = len(text)
+        return sections
+
+    def _close_member(self, text, end):
+        member = text[self._member_start:end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except json.JSONDecodeError:
+            return []  # left for the caller's final json.loads to report
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from utils import config as Config
+
+
+def make_cache_key(pdf_bytes: bytes, model: str, fingerprint: str) -> str:
+    """
+    `fingerprint` is the parsing prompt's registry content_hash, so editing the
+    prompt or schema invalidates old entries.
+    """
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(pdf_bytes).digest())
+    h.update(model.encode("utf-8"))
+    h.update(fingerprint.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResumeParseCache:
+    """
+    Two-tier cache for parsed resume JSON: an in-memory LRU in front of a
+    directory of <key>.json files that is trimmed (least recently used first)
+    once it grows past `max_disk_bytes`.
+    """
+
+    def __init__(self, cache_dir, max_memory_items=512, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = f.read()
+            os.utime(path)  # bump recency for disk eviction
+        except OSError:
+            return None
+
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value: str):
+        self._remember(key, value)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("❌ Resume cache write failed:", str(e))
+            return
+
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        if total <= self.max_disk_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+resume_cache = ResumeParseCache(
+    Config.RESUME_CACHE_DIR,
+    max_memory_items=Config.RESUME_CACHE_MEMORY_ITEMS,
+    max_disk_bytes=Config.RESUME_CACHE_MAX_DISK_BYTES,
+)
@@ -0,0 +1,24 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from utils import config as Config
+
+
+# Shared, bounded executor for blocking work (OCR, requests, sync SDK calls)
+# that has to run from an async FastAPI handler without freezing the event loop.
+executor = ThreadPoolExecutor(max_workers=Config.SYNC_POOL_WORKERS, thread_name_prefix="sync-pool")
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """
+    Run a blocking function on the shared thread pool and await its result.
+    The caller's contextvars (e.g. the LLM priority class) carry over.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_pool():
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,42 @@
+import functools
+import math
+from utils import config as Config
+
+try:
+    import tiktoken
+except ImportError:  # in requirements.txt; without it counts are a chars-per-token estimate
+    tiktoken = None
+
+
+# Model tokenizer used for prompt budgeting. gpt-5 / gpt-4.1 share o200k_base.
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        reason = "tiktoken is not installed"
+    else:
+        try:
+            return tiktoken.get_encoding(Config.TOKENIZER_ENCODING)
+        except Exception as e:  # encoding files not downloadable (offline container)
+            reason = f"{Config.TOKENIZER_ENCODING} could not be loaded ({e})"
+    print(f"⚠️ Token counts fall back to len/{Config.TOKEN_ESTIMATE_CHARS:g} estimates: {reason}. "
+          "Matcher batch packing, email batch budgets and rate limiter reservations run on the estimate.")
+    return None
+
+
+def tokenizer_available():
+    """
+    True when counts come from the real tokenizer; loads it (and warns if it can't) on first call.
+    """
+    return _encoding() is not None
+
+
+def count_tokens(text):
+    """
+    Tokens in `text` with the local tokenizer, or an estimate when tiktoken
+    is not installed (JSON-ish prompt text runs close to 4 chars per token).
+    """
+    text = str(text)
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / Config.TOKEN_ESTIMATE_CHARS)
@@ -1,3 +1,5 @@
+import io
+import zipfile
 import fitz  # PyMuPDF
 
 def is_pdf_text_based(file_path, min_words=20):
@@ -19,3 +21,32 @@ def is_pdf_text_based(file_path, min_words=20):
 def save_text_to_file(text, file_path):
     with open(file_path, 'w', encoding='utf-8') as file:
         file.write(text)
+
+
+
+class ZipTooLarge(ValueError):
+    """Raised when a zip archive is over the size, PDF count or decompressed size limit."""
+
+
+def read_pdfs_from_zip(zip_bytes, max_bytes=None, max_pdfs=None, max_unzipped_bytes=None):
+    """
+    Return [(filename, pdf_bytes), ...] for every PDF inside an in-memory zip archive.
+    Limits are checked against the archive's directory before anything is
+    decompressed (zipfile never inflates a member past its declared size).
+    """
+    if max_bytes is not None and len(zip_bytes) > max_bytes:
+        raise ZipTooLarge(f"Zip archive is larger than {max_bytes} bytes.")
+
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(".pdf")
+            and not info.filename.startswith("__MACOSX/")
+        ]
+        if max_pdfs is not None and len(members) > max_pdfs:
+            raise ZipTooLarge(f"Zip archive holds {len(members)} PDFs, at most {max_pdfs} allowed.")
+        unzipped = sum(info.file_size for info in members)
+        if max_unzipped_bytes is not None and unzipped > max_unzipped_bytes:
+            raise ZipTooLarge(f"Zip archive decompresses to {unzipped} bytes, at most {max_unzipped_bytes} allowed.")
+        return [(info.filename, archive.read(info)) for info in members]